@@ -0,0 +1,55 @@
+# Author: PB & Claude
+# Maintainer: PB
+# Original date: 2025.09.04
+# License: (c) HRDAG, 2025, GPL-2 or newer
+#
+# ------
+# n2s/scripts/blob_format.py
+
+"""
+Binary blob container shared by blobify, deblobify and the workers.
+
+Layout:
+    b"N2SB" | version (u8) | metadata length (u32 LE) | metadata JSON | LZ4
+
+The LZ4 part is one or more native LZ4 frames, so the body can be
+streamed straight through a decompressor with no base64 or JSON parsing.
+Older blobs are JSON documents and always start with "{", which never
+collides with the magic.
+"""
+
+import json
+import struct
+from typing import BinaryIO, Final, Optional
+
+BLOB_MAGIC: Final = b"N2SB"
+BLOB_VERSION: Final = 1
+_HEADER: Final = struct.Struct("<4sBI")
+
+
+def pack_header(metadata: dict) -> bytes:
+    """Build the container header for a blob with the given metadata."""
+    meta_json = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(BLOB_MAGIC, BLOB_VERSION, len(meta_json)) + meta_json
+
+
+def is_binary_blob(prefix: bytes) -> bool:
+    """True if the first bytes of a blob file carry the binary magic."""
+    return prefix[:len(BLOB_MAGIC)] == BLOB_MAGIC
+
+
+def read_header(f: BinaryIO) -> Optional[dict]:
+    """Read the container header, leaving f at the start of the LZ4 body.
+
+    Returns None (with f rewound) when the file is not a binary blob.
+    """
+    start = f.tell()
+    fixed = f.read(_HEADER.size)
+    if len(fixed) < _HEADER.size or not is_binary_blob(fixed):
+        f.seek(start)
+        return None
+
+    _, version, meta_len = _HEADER.unpack(fixed)
+    if version != BLOB_VERSION:
+        raise ValueError(f"Unsupported blob container version {version}")
+    return json.loads(f.read(meta_len))
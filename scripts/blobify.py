@@ -16,9 +16,6 @@
 # ------
 # n2s/scripts/blobify.py
 
-import base64
-import io
-import json
 import lz4.frame
 import os
 from pathlib import Path
@@ -28,6 +25,8 @@ import blake3
 import magic
 import typer
 
+from blob_format import pack_header
+
 
 def get_filetype(file_content: bytes) -> str:
     """Get file type using python-magic from content buffer."""
@@ -38,12 +37,12 @@ def get_filetype(file_content: bytes) -> str:
 
 
 # Configuration
-CHUNK_SIZE = 10 * 1024 * 1024  # 10MB chunks for reading file (each becomes one LZ4 frame)
+CHUNK_SIZE = 10 * 1024 * 1024  # 10MB chunks for reading file
 
 
 def create_blob(file_path: Path, output_dir: str = "/tmp") -> str:
     """
-    Create blob from file: read → hash → compress → encode → JSON wrap → write.
+    Create blob from file: read → hash → compress → write binary container.
 
     Args:
         file_path: Path to source file
@@ -60,51 +59,30 @@ def create_blob(file_path: Path, output_dir: str = "/tmp") -> str:
     temp_fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
     
     try:
-        with os.fdopen(temp_fd, 'w') as out_file:
-            # Write JSON header with multi-frame content structure
-            out_file.write('{\n  "content": {\n    "encoding": "lz4-multiframe",\n    "frames": [\n')
+        with os.fdopen(temp_fd, 'wb') as out_file, open(file_path, 'rb') as f:
+            hasher = blake3.blake3()
+            
+            # Filetype goes in the header, so sniff it from the first chunk
+            chunk = f.read(CHUNK_SIZE)
+            filetype = get_filetype(chunk) if chunk else "unknown"
+            out_file.write(pack_header({
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "filetype": filetype,
+                "encryption": False,
+            }))
             
-            # Stream process file in single pass - each chunk becomes independent LZ4 frame
-            with open(file_path, 'rb') as f:
-                hasher = blake3.blake3()
-                first_chunk = True
-                filetype = "unknown"
-                frame_count = 0
-                
-                while True:
-                    chunk = f.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                        
-                    # Use first chunk for magic detection
-                    if first_chunk:
-                        filetype = get_filetype(chunk)
-                        first_chunk = False
-                        
-                    # Update hash
-                    hasher.update(chunk)
-                    
-                    # Compress each chunk as independent LZ4 frame
-                    compressed_frame = lz4.frame.compress(chunk)
-                    
-                    # Base64 encode frame and write to JSON
-                    b64_frame = base64.b64encode(compressed_frame).decode('ascii')
-                    
-                    if frame_count > 0:
-                        out_file.write(',\n')
-                    out_file.write(f'      "{b64_frame}"')
-                    frame_count += 1
-                
-                # Generate blobid
-                blobid = hasher.hexdigest()
+            # One native LZ4 frame for the whole file, fed chunk by chunk
+            compressor = lz4.frame.LZ4FrameCompressor()
+            out_file.write(compressor.begin())
+            while chunk:
+                hasher.update(chunk)
+                out_file.write(compressor.compress(chunk))
+                chunk = f.read(CHUNK_SIZE)
+            out_file.write(compressor.flush())
             
-            # Write JSON footer
-            out_file.write('\n    ]\n  },\n  "metadata": {\n')
-            out_file.write(f'    "size": {stat.st_size},\n')
-            out_file.write(f'    "mtime": {stat.st_mtime},\n')
-            out_file.write(f'    "filetype": "{filetype}",\n')
-            out_file.write('    "encryption": false\n')
-            out_file.write('  }\n}')
+            # Generate blobid
+            blobid = hasher.hexdigest()
         
         # Move temp file to final destination
         dest_path = Path(output_dir) / blobid
@@ -5,6 +5,8 @@
 #   "lz4",
 #   "blake3",
 #   "typer",
+#   "orjson",
+#   "pybase64",
 # ]
 # ///
 
@@ -15,25 +17,43 @@
 # ------
 # n2s/scripts/deblobify.py
 
-import base64
-import json
 import lz4.frame
+import mmap
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import blake3
+import orjson
+import pybase64
 import typer
 
+from blob_format import read_header
+
+# Read buffer for the raw LZ4 body of binary blobs; allocated once per
+# restore_many() worker thread and reused for every blob it handles
+BINARY_READ_CHUNK = 4 << 20
+
+# Restore threads; blake3 and lz4 release the GIL, but NAS I/O saturates
+# well before the CPUs do
+DEFAULT_JOBS = min(os.cpu_count() or 1, 8)
+
+# Base64 slice fed to the decoder per step; a multiple of 4 so every
+# slice decodes independently
+B64_STREAM_CHUNK = 4 * 1024 * 1024
+
+
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
 
 def format_size(bytes_val: int) -> str:
     """Format bytes as human readable."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes_val < 1024:
-            return f"{bytes_val:.1f}{unit}"
-        bytes_val /= 1024
-    return f"{bytes_val:.1f}TB"
+    # Each unit is 2**10 of the previous one, so the bit length picks it
+    i = min(max(bytes_val.bit_length() - 1, 0) // 10, len(SIZE_UNITS) - 1)
+    return f"{bytes_val / (1 << (i * 10)):.1f}{SIZE_UNITS[i]}"
 
 
 def format_timestamp(timestamp: float) -> str:
@@ -41,173 +61,387 @@ def format_timestamp(timestamp: float) -> str:
     return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
 
+def _new_hasher():
+    """BLAKE3 hasher that may use several threads on large updates."""
+    # Restores hash MB-sized frames, where the tree-parallel mode pays off
+    return blake3.blake3(max_threads=blake3.blake3.AUTO)
+
+
+def _frame_lines(json_file):
+    """Yield base64 frame strings until the end of the frames array."""
+    for line in json_file:
+        line = line.strip()
+        if line in (']', '],'):
+            break  # End of frames
+        
+        # Extract base64 frame from line like '      "base64data...",'
+        if line.startswith('"') and (line.endswith('"') or line.endswith('",')):
+            frame_b64 = line.strip('"",')
+            if frame_b64:  # Skip empty lines
+                yield frame_b64
+
+
+def _stream_frames_verify(json_file, out_file, hasher) -> int:
+    """Decode, write and hash every frame; returns frame count."""
+    frames_processed = 0
+    for frame_b64 in _frame_lines(json_file):
+        compressed_frame = pybase64.b64decode(frame_b64, validate=False)
+        decompressed_chunk = lz4.frame.decompress(compressed_frame)
+        out_file.write(decompressed_chunk)
+        hasher.update(decompressed_chunk)
+        frames_processed += 1
+    return frames_processed
+
+
+def _stream_frames_noverify(json_file, out_file) -> int:
+    """Decode and write every frame; returns frame count."""
+    frames_processed = 0
+    for frame_b64 in _frame_lines(json_file):
+        compressed_frame = pybase64.b64decode(frame_b64, validate=False)
+        out_file.write(lz4.frame.decompress(compressed_frame))
+        frames_processed += 1
+    return frames_processed
 
 
+def _read_trailing_metadata(json_file) -> dict:
+    """Parse the metadata object that follows the frames array."""
+    # blobify writes metadata after the frames, so the tail is small
+    # enough to hand to a real JSON parser
+    tail = json_file.read()
+    start = tail.find('"metadata"')
+    if start < 0:
+        raise ValueError("Could not extract metadata from blob file")
+    return orjson.loads('{' + tail[start:])['metadata']
+
+
+def _expected_digest(blob_path: str) -> Optional[bytes]:
+    """Raw BLAKE3 digest named by a blob file, or None if not a blobid."""
+    name = Path(blob_path).name
+    if len(name) != 64:
+        return None
+    try:
+        return bytes.fromhex(name)
+    except ValueError:
+        return None
+
+
+def _verify_digest(expected: bytes, actual: bytes) -> None:
+    """Compare raw digests; the hex form is only built for the error."""
+    if actual != expected:
+        typer.echo(f"⚠ Hash mismatch! Expected: {expected.hex()}, Got: {actual.hex()}", err=True)
+        raise typer.Exit(1)
 
-def _restore_multiframe_streaming(json_file, output_path: str, verify: bool) -> str:
+
+def _restore_multiframe_streaming(json_file, output_path: str, expected: Optional[bytes]) -> str:
     """Stream restore multi-frame format without loading all into memory."""
-    hasher = blake3.blake3() if verify else None
-    metadata = None
+    for line in json_file:
+        if '"frames": [' in line:
+            break
     
+    # Pick the loop once so the per-frame path carries no verify branch
     with open(output_path, 'wb') as out_file:
-        in_frames = False
-        frames_processed = 0
-        
-        for line in json_file:
-            # Extract metadata
-            if '"metadata"' in line and not metadata:
-                # Simple metadata extraction for common format
-                if '"size":' in line:
-                    size_match = line.split('"size":')[1].split(',')[0].strip()
-                    mtime_line = next(json_file, '')
-                    mtime_match = mtime_line.split('"mtime":')[1].split(',')[0].strip()
-                    filetype_line = next(json_file, '')
-                    filetype_match = filetype_line.split('"filetype":')[1].split(',')[0].strip().strip('"')
-                    
-                    metadata = {
-                        'size': int(size_match),
-                        'mtime': float(mtime_match),
-                        'filetype': filetype_match
-                    }
-            
-            # Process frames array
-            if '"frames": [' in line:
-                in_frames = True
-                continue
-                
-            if in_frames:
-                if line.strip() in [']', '],']:
-                    break  # End of frames
-                    
-                # Extract base64 frame from line like '      "base64data...",'
-                line = line.strip()
-                if line.startswith('"') and (line.endswith('"') or line.endswith('",') or line.endswith('",')):
-                    # Extract base64 content
-                    frame_b64 = line.strip('"",')
-                    
-                    if frame_b64:  # Skip empty lines
-                        # Decode and decompress frame
-                        compressed_frame = base64.b64decode(frame_b64)
-                        decompressed_chunk = lz4.frame.decompress(compressed_frame)
-                        
-                        # Stream write
-                        out_file.write(decompressed_chunk)
-                        if hasher:
-                            hasher.update(decompressed_chunk)
-                        
-                        frames_processed += 1
+        if expected:
+            hasher = _new_hasher()
+            frames_processed = _stream_frames_verify(json_file, out_file, hasher)
+        else:
+            frames_processed = _stream_frames_noverify(json_file, out_file)
     
     if frames_processed == 0:
         raise ValueError("No frames processed from multi-frame blob")
     
-    if not metadata:
-        raise ValueError("Could not extract metadata from blob file")
+    metadata = _read_trailing_metadata(json_file)
     
     # Restore mtime
     os.utime(output_path, (metadata['mtime'], metadata['mtime']))
     
-    # Hash verification
-    if verify and hasher:
-        actual_hash = hasher.hexdigest()
-        expected_hash = Path(output_path).parent.parent.name if 'tmp' in str(output_path) else Path(output_path).name
-        if '/' in str(output_path):
-            expected_hash = [p for p in str(output_path).split('/') if len(p) == 64]
-            expected_hash = expected_hash[0] if expected_hash else Path(output_path).name
-        
-        if len(expected_hash) == 64 and actual_hash != expected_hash:
-            typer.echo(f"⚠ Hash mismatch! Expected: {expected_hash}, Got: {actual_hash}", err=True)
-            raise typer.Exit(1)
+    if expected:
+        _verify_digest(expected, hasher.digest())
     
     return output_path
 
 
-def _restore_legacy_formats(blob_data: dict, output_path: str, verify: bool) -> str:
+def _iter_legacy_chunks(content):
+    """Yield decompressed chunks from the content field of an old blob."""
+    if isinstance(content, str):
+        # Original format: single base64 string
+        parts = (content,)
+    elif isinstance(content, dict) and content.get('encoding', 'lz4+base64-chunked') == 'lz4+base64-chunked':
+        # Legacy chunked format: base64 pieces of one LZ4 stream
+        parts = content['chunks']
+    else:
+        return
+    
+    dctx = lz4.frame.LZ4FrameDecompressor()
+    for part in parts:
+        chunk = dctx.decompress(pybase64.b64decode(part, validate=False))
+        if chunk:
+            yield chunk
+
+
+def _restore_legacy_formats(blob_data: dict, output_path: str, expected: Optional[bytes]) -> str:
     """Restore old format blobs (requires full memory load)."""
     metadata = blob_data['metadata']
-    hasher = blake3.blake3() if verify else None
+    chunks = _iter_legacy_chunks(blob_data['content'])
     
+    # Hash each chunk as it is written rather than re-reading the output
     with open(output_path, 'wb') as out_file:
-        if isinstance(blob_data['content'], str):
-            # Original format: single base64 string
-            content_b64 = blob_data['content']
-            compressed_content = base64.b64decode(content_b64)
-            decompressed_content = lz4.frame.decompress(compressed_content)
-            out_file.write(decompressed_content)
+        if expected:
+            hasher = _new_hasher()
+            for chunk in chunks:
+                out_file.write(chunk)
+                hasher.update(chunk)
+        else:
+            for chunk in chunks:
+                out_file.write(chunk)
+    
+    # Restore mtime
+    os.utime(output_path, (metadata['mtime'], metadata['mtime']))
+    
+    if expected:
+        _verify_digest(expected, hasher.digest())
+    
+    return output_path
+
+
+def _find_inline_content(buf) -> Optional[tuple[int, int]]:
+    """Locate the base64 body of a single-string "content" field.
+    
+    Returns (start, end) offsets of the string body, or None when content
+    is not a plain string (e.g. the legacy chunked dict).
+    """
+    key = buf.find(b'"content"')
+    if key < 0:
+        return None
+    pos = key + len(b'"content"')
+    while buf[pos:pos + 1] in (b' ', b'\t', b'\r', b'\n', b':'):
+        pos += 1
+    if buf[pos:pos + 1] != b'"':
+        return None
+    
+    # Content is base64, so the next quote closes it - no escapes to handle
+    start = pos + 1
+    end = buf.find(b'"', start)
+    if end < 0:
+        return None
+    return start, end
+
+
+def _restore_inline_streaming(mm, span: tuple[int, int], output_path: str, expected: Optional[bytes]) -> str:
+    """Stream a single-string blob base64 -> lz4 -> file from an mmap."""
+    start, end = span
+    hasher = _new_hasher() if expected else None
+    dctx = lz4.frame.LZ4FrameDecompressor()
+    
+    # Slices are a few MB, so the per-slice verify branch is negligible
+    with open(output_path, 'wb') as out_file, memoryview(mm) as view:
+        for offset in range(start, end, B64_STREAM_CHUNK):
+            piece = view[offset:min(offset + B64_STREAM_CHUNK, end)]
+            chunk = dctx.decompress(pybase64.b64decode(piece, validate=False))
+            out_file.write(chunk)
             if hasher:
-                hasher.update(decompressed_content)
-        
-        elif isinstance(blob_data['content'], dict):
-            content_info = blob_data['content']
-            encoding = content_info.get('encoding', 'lz4+base64-chunked')
-            
-            if encoding == 'lz4+base64-chunked':
-                # Legacy chunked format
-                chunks = content_info['chunks']
-                compressed_parts = []
-                for chunk in chunks:
-                    compressed_parts.append(base64.b64decode(chunk))
-                
-                compressed_content = b''.join(compressed_parts)
-                decompressed_content = lz4.frame.decompress(compressed_content)
-                out_file.write(decompressed_content)
-                if hasher:
-                    hasher.update(decompressed_content)
+                hasher.update(chunk)
+    
+    # Blank out the content string; what remains is a small JSON object
+    metadata = orjson.loads(mm[:start] + mm[end:])['metadata']
     
     # Restore mtime
     os.utime(output_path, (metadata['mtime'], metadata['mtime']))
     
-    # Hash verification  
-    if verify and hasher:
-        actual_hash = hasher.hexdigest()
-        expected_hash = Path(output_path).parent.parent.name if 'tmp' in str(output_path) else Path(output_path).name
-        if '/' in str(output_path):
-            expected_hash = [p for p in str(output_path).split('/') if len(p) == 64]
-            expected_hash = expected_hash[0] if expected_hash else Path(output_path).name
-            
-        if len(expected_hash) == 64 and actual_hash != expected_hash:
-            typer.echo(f"⚠ Hash mismatch! Expected: {expected_hash}, Got: {actual_hash}", err=True)
-            raise typer.Exit(1)
+    if expected:
+        _verify_digest(expected, hasher.digest())
+    
+    return output_path
+
+
+def _iter_lz4_body(f, buf: bytearray):
+    """Yield decompressed chunks from the concatenated LZ4 frames in f."""
+    dctx = lz4.frame.LZ4FrameDecompressor()
+    in_frame = False  # dctx has been fed part of a frame
+    view = memoryview(buf)
+    while n := f.readinto(buf):
+        data = view[:n]
+        while data:
+            chunk = dctx.decompress(data)
+            in_frame = True
+            if chunk:
+                yield chunk
+            if not dctx.eof:
+                break
+            # Frame finished; any leftover bytes start the next frame
+            data = dctx.unused_data
+            dctx = lz4.frame.LZ4FrameDecompressor()
+            in_frame = False
+    
+    # Running out of input mid-frame means the blob was cut short
+    if in_frame:
+        raise ValueError("Truncated blob: LZ4 body ends inside a frame")
+
+
+def _restore_binary_streaming(f, metadata: dict, output_path: str, expected: Optional[bytes], buf: bytearray) -> str:
+    """Stream the LZ4 body of a binary container blob to output_path."""
+    chunks = _iter_lz4_body(f, buf)
+    
+    with open(output_path, 'wb') as out_file:
+        if expected:
+            hasher = _new_hasher()
+            for chunk in chunks:
+                out_file.write(chunk)
+                hasher.update(chunk)
+        else:
+            for chunk in chunks:
+                out_file.write(chunk)
+        written = out_file.tell()
+    
+    if written != metadata['size']:
+        raise ValueError(f"Size mismatch: restored {written} bytes, metadata says {metadata['size']}")
+    
+    # Restore mtime
+    os.utime(output_path, (metadata['mtime'], metadata['mtime']))
+    
+    if expected:
+        _verify_digest(expected, hasher.digest())
     
     return output_path
 
 
+def _restore_one(blob_path: str, output_path: str, verify: bool, buf: bytearray) -> str:
+    """Restore a single blob using a caller-provided read buffer."""
+    expected = _expected_digest(blob_path) if verify else None
+    
+    # Binary container (current format) - no base64 or JSON to get through
+    with open(blob_path, 'rb') as f:
+        metadata = read_header(f)
+        if metadata is not None:
+            return _restore_binary_streaming(f, metadata, output_path, expected, buf)
+    
+    # JSON formats: peek at the file to determine which one
+    with open(blob_path, 'r') as f:
+        first_chunk = f.read(1024)  # Read first 1KB to detect format
+        f.seek(0)
+        
+        if '"encoding": "lz4-multiframe"' in first_chunk:
+            # Multi-frame format - use streaming parser
+            return _restore_multiframe_streaming(f, output_path, expected)
+    
+    with open(blob_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                span = _find_inline_content(mm)
+                if span:
+                    # Original single-string format - stream from the mmap
+                    return _restore_inline_streaming(mm, span, output_path, expected)
+        
+        # Legacy chunked format - full load is unavoidable, so use orjson
+        # (bytes in) to keep the parse itself cheap
+        blob_data = orjson.loads(f.read())
+    return _restore_legacy_formats(blob_data, output_path, expected)
+
+
 def restore_blob(blob_path: str, output_path: str, verify: bool = True) -> str:
     """
-    Restore file from blob with streaming support for multi-frame format.
+    Restore file from blob, streaming wherever the format allows.
+    
+    Handles the binary container as well as the older JSON formats
+    (multi-frame, single string and chunked).
     
     Args:
         blob_path: Path to blob file
         output_path: Where to write restored file
-        verify: Whether to verify hash integrity
+        verify: Whether to verify hash integrity against the blob's name
         
     Returns:
         Path to restored file
     """
-    # First, peek at the file to determine format
-    with open(blob_path, 'r') as f:
-        first_chunk = f.read(1024)  # Read first 1KB to detect format
-        f.seek(0)
+    return _restore_one(blob_path, output_path, verify, bytearray(BINARY_READ_CHUNK))
+
+
+def restore_many(pairs: list[tuple[str, str]], verify: bool = True,
+                 jobs: int = DEFAULT_JOBS) -> list[tuple[str, str]]:
+    """
+    Restore many blobs in parallel threads.
+    
+    Each thread keeps one read buffer for all the blobs it restores;
+    decompressors and hashers are created per blob, so nothing is shared
+    between threads.
+    
+    Args:
+        pairs: (blob_path, output_path) tuples
+        verify: Whether to verify hash integrity against each blob's name
+        jobs: Number of restore threads
         
-        if '"encoding": "lz4-multiframe"' in first_chunk:
-            # Multi-frame format - use streaming parser
-            return _restore_multiframe_streaming(f, output_path, verify)
-        else:
-            # Old formats - use full JSON load (unavoidable memory usage)
-            blob_data = json.load(f)
-            return _restore_legacy_formats(blob_data, output_path, verify)
+    Returns:
+        (blob_path, error message) for every blob that failed to restore
+    """
+    local = threading.local()
+    
+    def restore_pair(pair: tuple[str, str]) -> Optional[tuple[str, str]]:
+        blob_path, output_path = pair
+        if not hasattr(local, 'buf'):
+            local.buf = bytearray(BINARY_READ_CHUNK)
+        try:
+            _restore_one(blob_path, output_path, verify, local.buf)
+        except typer.Exit:
+            return (blob_path, "hash mismatch")
+        except Exception as e:
+            return (blob_path, str(e))
+        return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        return [failure for failure in ex.map(restore_pair, pairs) if failure]
+
+
+def _read_manifest(manifest: Path) -> list[tuple[str, str]]:
+    """Parse 'blob_path<TAB>output_path' lines, skipping blanks."""
+    pairs = []
+    for line in manifest.read_text().splitlines():
+        if line.strip():
+            blob_path, output_path = line.split('\t', 1)
+            pairs.append((blob_path, output_path))
+    return pairs
+
+
+def _restore_set(pairs: list[tuple[str, str]], verify: bool, jobs: int) -> None:
+    """Restore a batch of blobs and report the outcome."""
+    failures = restore_many(pairs, verify=verify, jobs=jobs)
+    for blob_path, error in failures:
+        typer.echo(f"Error: {blob_path}: {error}", err=True)
+    
+    typer.echo(f"Restored {len(pairs) - len(failures)}/{len(pairs)} blobs")
+    if failures:
+        raise typer.Exit(1)
 
 
 def main(
-    blob_path: str = typer.Argument(..., help="Path to blob file to restore"),
-    output: str = typer.Option(..., "--output", "-o", help="Output path for restored file"),
-    no_verify: bool = typer.Option(False, "--no-verify", help="Skip hash verification")
+    blob_path: Optional[str] = typer.Argument(None, help="Blob file, or a directory of blobs, to restore"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Output path (a directory when restoring a directory)"),
+    manifest: Optional[Path] = typer.Option(None, "--manifest", help="File of 'blob_path<TAB>output_path' lines to restore"),
+    no_verify: bool = typer.Option(False, "--no-verify", help="Skip hash verification"),
+    jobs: int = typer.Option(DEFAULT_JOBS, "--jobs", "-j", help="Parallel restores for a directory or manifest")
 ):
-    """Restore a file from its blob representation. Requires --output path."""
+    """Restore files from their blob representation."""
+    
+    if manifest is not None:
+        _restore_set(_read_manifest(manifest), verify=not no_verify, jobs=jobs)
+        return
+    
+    if blob_path is None or output is None:
+        typer.echo("Error: BLOB_PATH and --output are required without --manifest", err=True)
+        raise typer.Exit(1)
     
     if not Path(blob_path).exists():
         typer.echo(f"Error: Blob file {blob_path} not found", err=True)
         raise typer.Exit(1)
     
+    if Path(blob_path).is_dir():
+        # Restore each blob to <output>/<blobid>
+        Path(output).mkdir(parents=True, exist_ok=True)
+        pairs = [
+            (str(p), str(Path(output) / p.name))
+            for p in sorted(Path(blob_path).iterdir()) if p.is_file()
+        ]
+        _restore_set(pairs, verify=not no_verify, jobs=jobs)
+        return
+    
     try:
         restored_path = restore_blob(blob_path, output, verify=not no_verify)
         
@@ -223,7 +457,9 @@ def main(
             blobid = Path(blob_path).name
             typer.echo(f"✓ Hash verified ({blobid[:16]}...)")
             
-    except json.JSONDecodeError:
+    except typer.Exit:
+        raise
+    except orjson.JSONDecodeError:
         typer.echo(f"Error: Invalid blob file format", err=True)
         raise typer.Exit(1)
     except lz4.frame.LZ4FrameError:
@@ -235,4 +471,4 @@ def main(
 
 
 if __name__ == "__main__":
-    typer.run(main)
\ No newline at end of file
+    typer.run(main)
@@ -35,6 +35,17 @@ DB_NAME = "pbnas"
 # Default stale claim timeout (minutes)
 DEFAULT_STALE_MINUTES = 30
 
+# Vacuum work_queue once dead tuples exceed this fraction of live ones
+# (the same shape as autovacuum's scale factor)
+VACUUM_DEAD_RATIO = 0.2
+
+# Continuous mode refreshes mv_fs_progress on its first cycle and then every
+# this many cycles; the refresh scans every eligible fs row
+PROGRESS_REFRESH_CYCLES = 6
+
+# One-shot stats refresh mv_fs_progress first when it is older than this
+PROGRESS_MAX_AGE_MINUTES = 30
+
 
 def setup_logging(verbose=False):
     """Configure loguru for console output."""
@@ -55,75 +66,81 @@ def get_connection():
 def reset_stale_claims(conn, minutes=DEFAULT_STALE_MINUTES):
     """Reset claims older than specified minutes."""
     with conn.cursor() as cur:
+        # Only a handful of rows are ever logged, so fetch just those
+        # rather than RETURNING every reset row
+        cur.execute("""
+            SELECT pth, claimed_by, claimed_at
+            FROM work_queue
+            WHERE claimed_at < NOW() - make_interval(mins => %s)
+            ORDER BY claimed_at
+            LIMIT 5
+        """, (minutes,))
+        sample = cur.fetchall()
+        
+        if not sample:
+            logger.info(f"No stale claims found (threshold: {minutes} minutes)")
+            return 0
+        
         cur.execute("""
             UPDATE work_queue 
             SET claimed_at = NULL, claimed_by = NULL
-            WHERE claimed_at < NOW() - INTERVAL '%s minutes'
-            RETURNING pth, claimed_by, claimed_at
+            WHERE claimed_at < NOW() - make_interval(mins => %s)
         """, (minutes,))
         
-        reset_rows = cur.fetchall()
+        reset_count = cur.rowcount
         conn.commit()
         
-        if reset_rows:
-            logger.info(f"Reset {len(reset_rows)} stale claims (older than {minutes} minutes)")
-            for pth, worker, claimed_at in reset_rows[:5]:  # Show first 5
-                age = datetime.now(claimed_at.tzinfo) - claimed_at
-                logger.debug(f"  Reset: {pth[:80]}... (claimed by {worker} {humanize.naturaldelta(age)} ago)")
-            if len(reset_rows) > 5:
-                logger.debug(f"  ... and {len(reset_rows) - 5} more")
-        else:
-            logger.info(f"No stale claims found (threshold: {minutes} minutes)")
+        logger.info(f"Reset {reset_count} stale claims (older than {minutes} minutes)")
+        for pth, worker, claimed_at in sample:
+            age = datetime.now(claimed_at.tzinfo) - claimed_at
+            logger.debug(f"  Reset: {pth[:80]}... (claimed by {worker} {humanize.naturaldelta(age)} ago)")
+        if reset_count > len(sample):
+            logger.debug(f"  ... and {reset_count - len(sample)} more")
         
-        return len(reset_rows)
+        return reset_count
 
 
 def add_new_files(conn, dry_run=False):
     """Add newly discovered files to the work queue."""
+    # Anti-join via LEFT JOIN lets the planner pick a hash anti-join, and
+    # counting RETURNING rows avoids a second scan of fs just to count.
+    # is_queue_eligible (see migration/add_is_queue_eligible.sql) lets
+    # this read idx_fs_queueable instead of evaluating LIKEs per row.
+    candidates_sql = """
+        SELECT f.pth
+        FROM fs f
+        LEFT JOIN work_queue wq USING (pth)
+        WHERE f.is_queue_eligible
+          AND f.blobid IS NULL
+          AND f.last_missing_at IS NULL
+          AND wq.pth IS NULL
+    """
+    
     with conn.cursor() as cur:
-        # Find files that need processing but aren't in queue
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM fs
-            WHERE main = true
-              AND blobid IS NULL
-              AND last_missing_at IS NULL
-              AND pth NOT LIKE '%/'
-              AND pth NOT LIKE '%/status'
-              AND pth NOT LIKE '%/.git'
-              AND pth NOT LIKE '%/.svn'
-              AND NOT EXISTS (
-                  SELECT 1 FROM work_queue wq WHERE wq.pth = fs.pth
-              )
+        if dry_run:
+            cur.execute(f"SELECT COUNT(*) FROM ({candidates_sql}) c")
+            new_count = cur.fetchone()[0]
+            if new_count > 0:
+                logger.info(f"Would add {new_count:,} new files to queue (dry run)")
+            else:
+                logger.info("No new files to add to queue")
+            return new_count
+        
+        cur.execute(f"""
+            WITH ins AS (
+                INSERT INTO work_queue (pth)
+                {candidates_sql}
+                ON CONFLICT (pth) DO NOTHING
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM ins
         """)
         
         new_count = cur.fetchone()[0]
+        conn.commit()
         
         if new_count > 0:
-            if dry_run:
-                logger.info(f"Would add {new_count:,} new files to queue (dry run)")
-            else:
-                logger.info(f"Adding {new_count:,} new files to work queue...")
-                cur.execute("""
-                    INSERT INTO work_queue (pth)
-                    SELECT pth 
-                    FROM fs
-                    WHERE main = true
-                      AND blobid IS NULL
-                      AND last_missing_at IS NULL
-                      AND pth NOT LIKE '%/'
-                      AND pth NOT LIKE '%/status'
-                      AND pth NOT LIKE '%/.git'
-                      AND pth NOT LIKE '%/.svn'
-                      AND NOT EXISTS (
-                          SELECT 1 FROM work_queue wq WHERE wq.pth = fs.pth
-                      )
-                    ON CONFLICT (pth) DO NOTHING
-                """)
-                
-                added = cur.rowcount
-                conn.commit()
-                logger.info(f"Added {added:,} new files to queue")
+            logger.info(f"Added {new_count:,} new files to queue")
         else:
             logger.info("No new files to add to queue")
         
@@ -133,89 +150,113 @@ def add_new_files(conn, dry_run=False):
 def remove_completed_files(conn, dry_run=False):
     """Remove files from queue that have been processed."""
     with conn.cursor() as cur:
-        # Find files in queue that have been processed
+        if dry_run:
+            cur.execute("""
+                SELECT COUNT(*)
+                FROM work_queue wq
+                JOIN fs ON fs.pth = wq.pth
+                WHERE fs.blobid IS NOT NULL
+                   OR fs.last_missing_at IS NOT NULL
+            """)
+            completed_count = cur.fetchone()[0]
+            if completed_count > 0:
+                logger.info(f"Would remove {completed_count:,} completed files from queue (dry run)")
+            else:
+                logger.info("No completed files to remove from queue")
+            return completed_count
+        
+        # One DELETE ... USING: no separate COUNT round trip, and the join
+        # against fs is evaluated once instead of twice
         cur.execute("""
-            SELECT COUNT(*)
-            FROM work_queue wq
-            JOIN fs ON fs.pth = wq.pth
-            WHERE fs.blobid IS NOT NULL
-               OR fs.last_missing_at IS NOT NULL
+            DELETE FROM work_queue wq
+            USING fs
+            WHERE fs.pth = wq.pth
+              AND (fs.blobid IS NOT NULL OR fs.last_missing_at IS NOT NULL)
         """)
         
-        completed_count = cur.fetchone()[0]
+        removed = cur.rowcount
+        conn.commit()
         
-        if completed_count > 0:
-            if dry_run:
-                logger.info(f"Would remove {completed_count:,} completed files from queue (dry run)")
-            else:
-                logger.info(f"Removing {completed_count:,} completed files from queue...")
-                cur.execute("""
-                    DELETE FROM work_queue
-                    WHERE pth IN (
-                        SELECT wq.pth
-                        FROM work_queue wq
-                        JOIN fs ON fs.pth = wq.pth
-                        WHERE fs.blobid IS NOT NULL
-                           OR fs.last_missing_at IS NOT NULL
-                    )
-                """)
-                
-                removed = cur.rowcount
-                conn.commit()
-                logger.info(f"Removed {removed:,} completed files from queue")
+        if removed > 0:
+            logger.info(f"Removed {removed:,} completed files from queue")
         else:
             logger.info("No completed files to remove from queue")
         
-        return completed_count
+        return removed
 
 
 def get_queue_stats(conn):
     """Get detailed queue statistics."""
     with conn.cursor() as cur:
-        # Queue stats
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE claimed_at IS NULL) as unclaimed,
-                COUNT(*) FILTER (WHERE claimed_at IS NOT NULL) as claimed,
-                MIN(claimed_at) as oldest_claim,
-                MAX(claimed_at) as newest_claim
-            FROM work_queue
-        """)
-        queue_stats = cur.fetchone()
-        
-        # Worker stats
+        # Queue, worker and fs stats in one statement so a remote DB costs
+        # a single round trip; worker stats come back as a JSON array.
+        # fs progress comes from mv_fs_progress as of its last refresh
+        # (see refresh_progress)
         cur.execute("""
-            SELECT claimed_by, COUNT(*) as claims
-            FROM work_queue
-            WHERE claimed_at IS NOT NULL
-            GROUP BY claimed_by
-            ORDER BY claims DESC
+            WITH queue AS (
+                SELECT 
+                    COUNT(*) as total,
+                    COUNT(*) FILTER (WHERE claimed_at IS NULL) as unclaimed,
+                    COUNT(*) FILTER (WHERE claimed_at IS NOT NULL) as claimed,
+                    MIN(claimed_at) as oldest_claim,
+                    MAX(claimed_at) as newest_claim
+                FROM work_queue
+            ),
+            workers AS (
+                SELECT claimed_by, COUNT(*) as claims
+                FROM work_queue
+                WHERE claimed_at IS NOT NULL
+                GROUP BY claimed_by
+            ),
+            progress AS (
+                SELECT completed, pending, missing, refreshed_at
+                FROM mv_fs_progress
+            )
+            SELECT q.total, q.unclaimed, q.claimed, q.oldest_claim, q.newest_claim,
+                   (SELECT COALESCE(json_agg(json_build_array(claimed_by, claims)
+                                             ORDER BY claims DESC), '[]')
+                    FROM workers),
+                   p.completed, p.pending, p.missing, p.refreshed_at
+            FROM queue q, progress p
         """)
-        worker_stats = cur.fetchall()
+        row = cur.fetchone()
         
-        # Processing stats from fs table
-        cur.execute("""
-            SELECT 
-                COUNT(*) FILTER (WHERE blobid IS NOT NULL) as completed,
-                COUNT(*) FILTER (WHERE blobid IS NULL AND last_missing_at IS NULL) as pending,
-                COUNT(*) FILTER (WHERE last_missing_at IS NOT NULL) as missing
-            FROM fs
-            WHERE main = true
-              AND pth NOT LIKE '%/'
-              AND pth NOT LIKE '%/status'
-              AND pth NOT LIKE '%/.git'
-              AND pth NOT LIKE '%/.svn'
-        """)
-        fs_stats = cur.fetchone()
+        queue_stats = row[:5]
+        worker_stats = [tuple(w) for w in row[5]]
+        fs_stats = row[6:]
         
         return queue_stats, worker_stats, fs_stats
 
 
+def refresh_progress(conn):
+    """Refresh the cached fs progress counts read by get_queue_stats."""
+    # A plain refresh: the view is one row, so CONCURRENTLY's diff against
+    # the old contents only adds work
+    with conn.cursor() as cur:
+        cur.execute("REFRESH MATERIALIZED VIEW mv_fs_progress")
+    conn.commit()
+
+
+def refresh_progress_if_stale(conn, max_age_minutes=PROGRESS_MAX_AGE_MINUTES):
+    """Refresh mv_fs_progress if its counts are older than max_age_minutes."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT refreshed_at < NOW() - make_interval(mins => %s)
+            FROM mv_fs_progress
+        """, (max_age_minutes,))
+        row = cur.fetchone()
+    conn.commit()
+    
+    if row is None or row[0]:
+        logger.info("Refreshing fs progress counts...")
+        refresh_progress(conn)
+
+
 def print_stats(queue_stats, worker_stats, fs_stats):
     """Print formatted statistics."""
     total, unclaimed, claimed, oldest_claim, newest_claim = queue_stats
-    completed, pending, missing = fs_stats
+    completed, pending, missing, refreshed_at = fs_stats
+    progress_age = humanize.naturaldelta(datetime.now(refreshed_at.tzinfo) - refreshed_at)
     
     logger.info(f"""
 {'='*60}
@@ -226,7 +267,7 @@ Queue Status:
   Unclaimed:         {unclaimed:,}
   Currently claimed: {claimed:,}
   
-Overall Progress:
+Overall Progress (as of {progress_age} ago):
   Completed files:   {completed:,}
   Pending files:     {pending:,}
   Missing files:     {missing:,}
@@ -261,36 +302,70 @@ def vacuum_queue(conn):
     logger.info("Vacuum complete")
 
 
+def dead_tuple_ratio(conn):
+    """Return n_dead_tup / n_live_tup for work_queue from pg_stat_user_tables."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT n_dead_tup, n_live_tup
+            FROM pg_stat_user_tables
+            WHERE relname = 'work_queue'
+        """)
+        row = cur.fetchone()
+    conn.commit()
+    
+    if not row:
+        return 0.0
+    dead, live = row
+    return dead / max(live, 1)
+
+
+class MaintCycle:
+    """State carried across continuous maintenance cycles."""
+    
+    def __init__(self, conn, stale_minutes=DEFAULT_STALE_MINUTES):
+        self.conn = conn
+        self.stale_minutes = stale_minutes
+        self.n = 0
+    
+    def run(self):
+        """Run one maintenance cycle."""
+        self.n += 1
+        logger.info(f"\n{'='*60}")
+        logger.info(f"Maintenance cycle {self.n} at {datetime.now():%Y-%m-%d %H:%M:%S}")
+        
+        # Reset stale claims
+        reset_stale_claims(self.conn, self.stale_minutes)
+        
+        # Add new files
+        add_new_files(self.conn)
+        
+        # Remove completed files
+        remove_completed_files(self.conn)
+        
+        # Show stats; the fs progress counts are only re-scanned every
+        # PROGRESS_REFRESH_CYCLES cycles
+        if self.n % PROGRESS_REFRESH_CYCLES == 1:
+            refresh_progress(self.conn)
+        queue_stats, worker_stats, fs_stats = get_queue_stats(self.conn)
+        print_stats(queue_stats, worker_stats, fs_stats)
+        
+        # Vacuum once dead tuples have piled up. Most of them come from the
+        # workers' claims and deletes rather than this cycle, so the ratio
+        # is checked every cycle (a single catalog read)
+        ratio = dead_tuple_ratio(self.conn)
+        if ratio > VACUUM_DEAD_RATIO:
+            logger.info(f"work_queue dead/live tuple ratio {ratio:.2f} > {VACUUM_DEAD_RATIO}")
+            vacuum_queue(self.conn)
+
+
 def continuous_maintenance(conn, interval_minutes=5, stale_minutes=30):
     """Run continuous maintenance loop."""
     logger.info(f"Starting continuous maintenance (interval: {interval_minutes} min)")
+    cycle = MaintCycle(conn, stale_minutes)
     
     while True:
         try:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Maintenance cycle at {datetime.now():%Y-%m-%d %H:%M:%S}")
-            
-            # Reset stale claims
-            reset_stale_claims(conn, stale_minutes)
-            
-            # Add new files
-            add_new_files(conn)
-            
-            # Remove completed files
-            remove_completed_files(conn)
-            
-            # Show stats
-            queue_stats, worker_stats, fs_stats = get_queue_stats(conn)
-            print_stats(queue_stats, worker_stats, fs_stats)
-            
-            # Vacuum periodically (every 10 cycles)
-            if hasattr(continuous_maintenance, 'cycle_count'):
-                continuous_maintenance.cycle_count += 1
-            else:
-                continuous_maintenance.cycle_count = 1
-            
-            if continuous_maintenance.cycle_count % 10 == 0:
-                vacuum_queue(conn)
+            cycle.run()
             
             logger.info(f"Next maintenance in {interval_minutes} minutes...")
             time.sleep(interval_minutes * 60)
@@ -315,6 +390,8 @@ def main():
                         help="Remove completed files from queue")
     parser.add_argument("--stats", action="store_true", 
                         help="Show queue statistics")
+    parser.add_argument("--refresh-progress", action="store_true",
+                        help="Refresh the fs progress counts before showing stats")
     parser.add_argument("--vacuum", action="store_true", 
                         help="Run VACUUM ANALYZE on work_queue")
     parser.add_argument("--all", action="store_true",
@@ -347,6 +424,10 @@ def main():
                 args.stats, args.vacuum, args.continuous, args.all]):
         args.stats = True
     
+    # --refresh-progress implies --stats
+    if args.refresh_progress:
+        args.stats = True
+    
     conn = get_connection()
     
     try:
@@ -386,6 +467,12 @@ def main():
             if args.stats:
                 if args.all:
                     logger.info("Step 5: Final statistics...")
+                # --all rescans the fs progress counts; plain --stats only
+                # does when they are older than PROGRESS_MAX_AGE_MINUTES
+                if args.all or args.refresh_progress:
+                    refresh_progress(conn)
+                else:
+                    refresh_progress_if_stale(conn)
                 queue_stats, worker_stats, fs_stats = get_queue_stats(conn)
                 print_stats(queue_stats, worker_stats, fs_stats)
                 
@@ -0,0 +1,39 @@
+-- Author: PB and Claude
+-- Date: 2025-09-04
+-- License: (c) HRDAG, 2025, GPL-2 or newer
+--
+-- ------
+-- n2s/scripts/migration/add_is_queue_eligible.sql
+
+-- Precompute queue eligibility so maintain_work_queue stops re-evaluating
+-- four LIKE patterns per fs row on every cycle. The predicate must match
+-- what add_new_files / get_queue_stats used to spell out inline.
+--
+-- NOTE: adding a STORED generated column rewrites fs; run off-hours.
+-- Run with psql (autocommit) - CREATE INDEX CONCURRENTLY cannot run
+-- inside a transaction block.
+
+-- Set timezone for this session
+SET timezone = 'America/Los_Angeles';
+
+ALTER TABLE fs ADD COLUMN IF NOT EXISTS is_queue_eligible boolean
+GENERATED ALWAYS AS (
+    main
+    AND pth NOT LIKE '%/'
+    AND pth NOT LIKE '%/status'
+    AND pth NOT LIKE '%/.git'
+    AND pth NOT LIKE '%/.svn'
+) STORED;
+
+-- Partial index covering exactly the rows add_new_files looks for
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fs_queueable
+ON fs(pth)
+WHERE is_queue_eligible
+  AND blobid IS NULL
+  AND last_missing_at IS NULL;
+
+-- Show current stats
+SELECT
+    COUNT(*) FILTER (WHERE is_queue_eligible) as eligible_files,
+    COUNT(*) FILTER (WHERE is_queue_eligible AND blobid IS NULL AND last_missing_at IS NULL) as queueable_files
+FROM fs;
@@ -0,0 +1,33 @@
+-- Author: PB and Claude
+-- Date: 2025-09-04
+-- License: (c) HRDAG, 2025, GPL-2 or newer
+--
+-- ------
+-- n2s/scripts/migration/add_mv_fs_progress.sql
+
+-- Cache the overall progress counts that maintain_work_queue reports, so
+-- get_queue_stats reads one row instead of scanning every eligible fs row.
+-- continuous_maintenance refreshes it every PROGRESS_REFRESH_CYCLES cycles,
+-- and one-shot stats refresh it when refreshed_at is older than
+-- PROGRESS_MAX_AGE_MINUTES (always with --all or --refresh-progress).
+--
+-- Requires is_queue_eligible (see add_is_queue_eligible.sql).
+
+-- Set timezone for this session
+SET timezone = 'America/Los_Angeles';
+
+-- Recreated (not IF NOT EXISTS) so databases with the earlier definition
+-- pick up refreshed_at
+DROP MATERIALIZED VIEW IF EXISTS mv_fs_progress;
+
+CREATE MATERIALIZED VIEW mv_fs_progress AS
+SELECT
+    now() AS refreshed_at,
+    COUNT(*) FILTER (WHERE blobid IS NOT NULL) AS completed,
+    COUNT(*) FILTER (WHERE blobid IS NULL AND last_missing_at IS NULL) AS pending,
+    COUNT(*) FILTER (WHERE last_missing_at IS NOT NULL) AS missing
+FROM fs
+WHERE is_queue_eligible;
+
+-- Show current stats
+SELECT completed, pending, missing, refreshed_at FROM mv_fs_progress;
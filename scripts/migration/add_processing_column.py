@@ -63,19 +63,41 @@ def run_migration():
 
 -- Add the column (safe operation - nullable column with no default)
 ALTER TABLE fs ADD COLUMN IF NOT EXISTS processing_started TIMESTAMP WITH TIME ZONE;
+"""
 
+    # CONCURRENTLY keeps writers on fs unblocked while the indexes build,
+    # but cannot run inside a transaction block - one statement each,
+    # executed in autocommit mode
+    index_sqls = [
+        """
 -- Create partial index for efficient querying (only indexes non-null values)
-CREATE INDEX IF NOT EXISTS idx_fs_processing_started
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fs_processing_started
 ON fs(processing_started)
 WHERE processing_started IS NOT NULL;
-
--- Create compound index for worker queries
-CREATE INDEX IF NOT EXISTS idx_fs_worker_selection
-ON fs(main, blobid, last_missing_at, processing_started, tree)
+""",
+        """
+-- Create partial index for worker queries. The predicate already pins
+-- main/blobid/last_missing_at/processing_started, so only the columns
+-- workers filter and order by (tree, then pth) are worth indexing
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fs_worker_selection
+ON fs(tree, pth)
 WHERE main = true 
   AND blobid IS NULL 
   AND last_missing_at IS NULL
   AND processing_started IS NULL;
+""",
+    ]
+
+    verify_sql = """
+SELECT
+    (SELECT row(column_name, data_type, is_nullable)::text
+     FROM information_schema.columns
+     WHERE table_name = 'fs' 
+       AND column_name = 'processing_started'),
+    (SELECT array_agg(indexname::text ORDER BY indexname)
+     FROM pg_indexes
+     WHERE tablename = 'fs'
+       AND (indexname LIKE '%processing%' OR indexname = 'idx_fs_worker_selection'))
 """
 
     conn = get_db_connection()
@@ -85,34 +107,38 @@ WHERE main = true
             cur.execute(migration_sql)
             
         conn.commit()
+        
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                # Earlier runs built idx_fs_worker_selection over all five
+                # columns; drop that version so it gets rebuilt on (tree, pth)
+                cur.execute("""
+                    SELECT indexdef FROM pg_indexes
+                    WHERE tablename = 'fs' AND indexname = 'idx_fs_worker_selection'
+                """)
+                row = cur.fetchone()
+                if row and "(tree, pth)" not in row[0]:
+                    logger.info("Dropping old five-column idx_fs_worker_selection...")
+                    cur.execute("DROP INDEX CONCURRENTLY idx_fs_worker_selection")
+                
+                for index_sql in index_sqls:
+                    logger.info("Building index concurrently...")
+                    cur.execute(index_sql)
+        finally:
+            conn.autocommit = False
         logger.info("✓ Migration completed successfully!")
         
-        # Verify the column was added
+        # Verify the column and indexes in one round trip
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT column_name, data_type, is_nullable
-                FROM information_schema.columns
-                WHERE table_name = 'fs' 
-                  AND column_name = 'processing_started'
-            """)
+            cur.execute(verify_sql)
+            column, indexes = cur.fetchone()
             
-            result = cur.fetchone()
-            if result:
-                logger.info(f"✓ Column verified: {result[0]} ({result[1]}, nullable: {result[2]})")
+            if column:
+                logger.info(f"✓ Column verified: {column}")
             else:
                 logger.error("✗ Column not found after migration!")
-                
-        # Check indexes
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT indexname
-                FROM pg_indexes
-                WHERE tablename = 'fs'
-                  AND indexname LIKE '%processing%'
-            """)
-            
-            indexes = cur.fetchall()
-            logger.info(f"✓ Created indexes: {[idx[0] for idx in indexes]}")
+            logger.info(f"✓ Created indexes: {indexes or []}")
             
     except psycopg2.Error as e:
         logger.error(f"Migration failed: {e}")
@@ -43,32 +43,37 @@ def run_migration():
 
 -- Add the column (safe operation - nullable column with no default)
 ALTER TABLE fs ADD COLUMN IF NOT EXISTS last_missing_at TIMESTAMP WITH TIME ZONE;
+"""
 
+    # CONCURRENTLY avoids blocking writers on fs, but has to run outside
+    # a transaction block
+    index_sql = """
 -- Create index for efficient querying (worker filters on this column)
-CREATE INDEX IF NOT EXISTS idx_fs_last_missing_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fs_last_missing_at
 ON fs(last_missing_at)
 WHERE last_missing_at IS NOT NULL;
 """
     
     stats_sql = """
--- Show current stats
+-- Show current stats, plus which trees have unprocessed files, in one scan
+WITH per_tree AS (
+    SELECT
+        tree,
+        COUNT(*) as total_files,
+        COUNT(*) FILTER (WHERE main = true) as main_files,
+        COUNT(*) FILTER (WHERE main = true AND blobid IS NULL) as unprocessed_main_files,
+        COUNT(*) FILTER (WHERE main = true AND blobid IS NULL AND last_missing_at IS NULL) as ready_to_process
+    FROM fs
+    GROUP BY tree
+)
 SELECT
-    COUNT(*) as total_files,
-    COUNT(*) FILTER (WHERE main = true) as main_files,
-    COUNT(*) FILTER (WHERE main = true AND blobid IS NULL) as unprocessed_main_files,
-    COUNT(*) FILTER (WHERE main = true AND blobid IS NULL AND last_missing_at IS NULL) as ready_to_process
-FROM fs;
-"""
-
-    trees_sql = """
--- Show which trees have unprocessed files
-SELECT
-    tree,
-    COUNT(*) FILTER (WHERE main = true AND blobid IS NULL AND last_missing_at IS NULL) as ready_to_process
-FROM fs
-WHERE tree IN ('osxgather', 'dump-2019')
-GROUP BY tree
-ORDER BY ready_to_process DESC;
+    SUM(total_files)::bigint,
+    SUM(main_files)::bigint,
+    SUM(unprocessed_main_files)::bigint,
+    SUM(ready_to_process)::bigint,
+    json_agg(json_build_array(tree, ready_to_process) ORDER BY ready_to_process DESC)
+        FILTER (WHERE tree IN ('osxgather', 'dump-2019'))
+FROM per_tree;
 """
 
     conn = get_db_connection()
@@ -79,27 +84,29 @@ ORDER BY ready_to_process DESC;
             # Run migration
             cur.execute(migration_sql)
             conn.commit()
+            
+            conn.autocommit = True
+            try:
+                cur.execute(index_sql)
+            finally:
+                conn.autocommit = False
             print("✓ Migration completed successfully")
             
             print("\n--- Current Database Stats ---")
             
             # Show stats
             cur.execute(stats_sql)
-            result = cur.fetchone()
-            if result:
-                total, main, unprocessed, ready = result
-                print(f"Total files: {total:,}")
-                print(f"Main files: {main:,}")
-                print(f"Unprocessed main files: {unprocessed:,}")
-                print(f"Ready to process: {ready:,}")
+            total, main, unprocessed, ready, trees = cur.fetchone()
+            print(f"Total files: {total or 0:,}")
+            print(f"Main files: {main or 0:,}")
+            print(f"Unprocessed main files: {unprocessed or 0:,}")
+            print(f"Ready to process: {ready or 0:,}")
             
             print("\n--- Files Ready to Process by Tree ---")
             
             # Show trees
-            cur.execute(trees_sql)
-            for row in cur.fetchall():
-                tree, ready = row
-                print(f"{tree}: {ready:,} files")
+            for tree, tree_ready in trees or []:
+                print(f"{tree}: {tree_ready:,} files")
                 
     except Exception as e:
         print(f"Migration failed: {e}")
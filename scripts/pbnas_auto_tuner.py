@@ -9,6 +9,8 @@
 #   "humanize",
 #   "psutil",
 #   "numpy",
+#   "orjson",
+#   "inotify_simple; sys_platform == 'linux'",
 # ]
 # ///
 
@@ -35,30 +37,45 @@ Data flow:
 - Large files (>50MB): Stream processing
 """
 
-import json
+import mmap
 import multiprocessing as mp
 import os
-import resource
+import re
 import signal
 import subprocess
 import sys
 import time
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_for_any
 from pathlib import Path
 from queue import Empty, Full
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 import blake3
 import humanize
 import lz4.frame
 import numpy as np
+import orjson
 import psutil
 import psycopg2
 from loguru import logger
-from psycopg2 import pool
+from psycopg2 import extensions, pool
+from psycopg2.extras import execute_values
+
+from blob_format import pack_header
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # Not Linux - UploadWorker polls the staging dir instead
+    INotify = None
+try:
+    import magic
+except ImportError:  # Blobs are typed application/octet-stream instead
+    magic = None
 
 # Configuration
 DB_HOST = "snowball"
@@ -69,32 +86,257 @@ UPLOAD_PATH = "/n2s/block_storage"
 SSH_PORT = "2222"
 STAGING_PATH = "/tmp/n2s_staging"
 
+# ssh options for rsync. ControlMaster/ControlPersist keep one multiplexed
+# connection open, so each batch skips the TCP handshake and key exchange
+SSH_OPTIONS = [
+    "-p", SSH_PORT,
+    "-o", "BatchMode=yes",
+    "-o", "ConnectTimeout=5",
+    "-o", "ServerAliveInterval=60",
+    "-o", "ControlMaster=auto",
+    "-o", "ControlPath=/tmp/n2s_ssh_%r@%h:%p",
+    "-o", "ControlPersist=600",
+]
+SSH_COMMAND = "ssh " + " ".join(SSH_OPTIONS)
+
+# Staged blobs are content-addressed and never exist remotely in an older
+# version, so rsync's delta algorithm only costs checksum passes. They are
+# already LZ4-compressed, so no -z either
+RSYNC_OPTIONS = [
+    "-av",
+    "--whole-file",
+    "--relative",
+    "--remove-source-files",  # Delete after upload
+    "-e", SSH_COMMAND,
+]
+
+# Concurrent rsyncs per upload batch. They share the ControlMaster
+# connection, so extra shards cost a channel each, not a handshake
+UPLOAD_SHARDS = 4
+
+# Failed rsyncs a staged blob gets before its upload worker gives up on it;
+# it stays staged for the shutdown emergency upload
+UPLOAD_RETRIES = 3
+
+# Relative path of a staged blob (AA/BB/blobid). Anything else under
+# STAGING_PATH (.DS_Store and the like) is left alone
+STAGED_BLOB_RE = re.compile(r'[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}')
+
 # Create staging directory
 Path(STAGING_PATH).mkdir(exist_ok=True)
 
 # Global queues (created by orchestrator)
 compress_queue = None
 connection_pool = None
+connection_pool_pid = None  # Process that opened connection_pool
+inherited_pools = []  # Parent pools a forked worker must leave open
 
 # Worker constraints
 MAX_HASH = 8
 MAX_COMPRESS = 8
 MAX_UPLOAD = 4
 
+# Kinds of tuning action, as named at the start of each action string
+# ("Hash+1", "Semaphores-1→2", ...). A kind that made throughput worse is
+# blacklisted for a while
+TUNE_ACTIONS = ('Hash', 'Compress', 'Upload', 'Semaphores', 'MemMax')
+BLACKLIST_SECONDS = 300
+
+# Linux I/O pressure (PSI): share of the last 10s in which some task was
+# stalled on I/O. Above PSI_IO_HIGH holds the semaphore count, above
+# PSI_IO_SEVERE lowers it
+PSI_IO_PATH = Path("/proc/pressure/io")
+PSI_IO_HIGH = 10.0
+PSI_IO_SEVERE = 20.0
+
+# How long print_stats reuses its work_queue counts. Each count scans the
+# whole table, and the ETA they feed doesn't need 5s resolution
+QUEUE_COUNT_SECONDS = 30
+
+# Items waiting for compression. A couple per compress worker keeps them
+# fed; a deeper queue just holds more file data in memory while it waits
+COMPRESS_QUEUE_SIZE = MAX_COMPRESS * 2
+
+# BLAKE3 threads for a single large file. Sized so that MAX_HASH workers
+# all hashing large files at once don't oversubscribe the CPUs
+LARGE_HASH_THREADS = max(1, min(4, (os.cpu_count() or 1) // MAX_HASH))
+
+# Files bigger than COMPRESS_FRAME_SIZE are compressed as independent LZ4
+# frames on a per-worker thread pool (lz4 releases the GIL), using up to
+# compress_threads() of its COMPRESS_MAX_THREADS threads at a time
+COMPRESS_FRAME_SIZE = 16 * 1024 * 1024
+COMPRESS_MAX_THREADS = 4
+
+# Read size for CompressWorker.page_in's pass over a file
+PAGE_IN_CHUNK = 4 * 1024 * 1024
+
+# Small-file data held in a HashWorker while its batch awaits the dedup
+# lookup; the batch is settled early once this much is buffered
+DEDUP_BATCH_BYTES = 64_000_000
+
+# Recently confirmed blob_ids kept per HashWorker, so repeated content
+# (empty files, .DS_Store, common binaries) skips the DB
+DEDUP_CACHE_SIZE = 4096
+
+# Shared memory pool: fixed segments reused for small files, so the common
+# case never creates or unlinks a /dev/shm object. Larger files (or an
+# exhausted pool) fall back to a dedicated segment per file
+SHM_SEGMENT_SIZE = 10_000_000
+SHM_POOL_SIZE = 16
+
+class ResizableSemaphore:
+    """Cross-process counting semaphore whose limit can change at runtime.
+    
+    Lowering the limit doesn't interrupt holders; new acquirers just wait
+    until usage drops below it.
+    """
+    
+    def __init__(self, limit: int):
+        self._cond = mp.Condition()
+        # Both guarded by _cond
+        self._limit = mp.Value('i', limit, lock=False)
+        self._in_use = mp.Value('i', 0, lock=False)
+        
+    def acquire(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_use.value < self._limit.value)
+            self._in_use.value += 1
+            
+    def release(self):
+        with self._cond:
+            self._in_use.value -= 1
+            self._cond.notify()
+            
+    def set_limit(self, limit: int):
+        with self._cond:
+            self._limit.value = limit
+            self._cond.notify_all()
+            
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+
+
 # Disk I/O coordination
 # Default value - can be overridden by orchestrator
-disk_io_semaphore = mp.Semaphore(3)  # Safe default
+disk_io_semaphore = ResizableSemaphore(3)  # Safe default
 
 # Shutdown flag
 shutdown_flag = mp.Event()
 verbose_mode = False  # Global flag for workers
 
+class LatencyWindow:
+    """Fixed-size ring buffer of the most recent latency samples (ms).
+    
+    Lives in shared memory, so a worker can push samples while the
+    orchestrator reads them without any IPC. Meant for a single writer.
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.buf = mp.RawArray('d', size)
+        self.count = mp.RawValue('q', 0)  # Samples ever pushed
+        
+    def push(self, value: float):
+        n = self.count.value
+        self.buf[n % self.size] = value
+        self.count.value = n + 1
+            
+    def __len__(self) -> int:
+        return min(self.count.value, self.size)
+    
+    def values(self) -> np.ndarray:
+        """Samples currently in the window (unordered once it has wrapped)."""
+        return np.frombuffer(self.buf, dtype=np.float64)[:len(self)]
+
+
 # Global metrics tracking
-db_latencies = {'claim': [], 'dedup': [], 'update': []}
-disk_read_latencies = []  # Track disk read times for thrashing detection
+db_latencies = {
+    'claim': LatencyWindow(1000),  # Keep last 1000
+    'dedup': LatencyWindow(1000),
+    'update': LatencyWindow(1000),
+}
 db_ops_queue = None  # Will be set by orchestrator for async DB ops
 
 
+# Worker stat names. Counters are int64, timings (ms) are float64
+STAT_COUNTERS = (
+    'files_processed', 'bytes_hashed', 'bytes_read', 'dedup_hits',
+    'files_reread', 'files_in_memory', 'shm_active_segments', 'shm_total_bytes',
+    'files_compressed', 'bytes_compressed', 'items_processed', 'idle_cycles',
+    'db_updates', 'db_removals',
+)
+STAT_TIMINGS = (
+    'read_time_ms', 'hash_time_ms', 'dedup_time_ms', 'queue_time_ms',
+    'total_time_ms', 'wait_time_ms', 'work_time_ms',
+)
+
+
+class SharedValues:
+    """Fixed set of named numbers in shared memory, with a dict-like interface.
+    
+    Subclasses list their int64 and float64 fields. Every instance has a
+    single writer, so updates need no lock and no IPC; other processes
+    read the current values directly.
+    """
+    INT_FIELDS = ()
+    FLOAT_FIELDS = ()
+    
+    def __init__(self, values: Optional[dict] = None):
+        self._ints = mp.Array('q', len(self.INT_FIELDS), lock=False)
+        self._floats = mp.Array('d', len(self.FLOAT_FIELDS), lock=False)
+        self._index = {name: (self._ints, i) for i, name in enumerate(self.INT_FIELDS)}
+        self._index.update({name: (self._floats, i) for i, name in enumerate(self.FLOAT_FIELDS)})
+        if values:
+            self.update(values)
+        
+    def __getitem__(self, key: str):
+        values, i = self._index[key]
+        return values[i]
+    
+    def __setitem__(self, key: str, value):
+        values, i = self._index[key]
+        values[i] = value
+        
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+    
+    def get(self, key: str, default=0):
+        if key not in self._index:
+            return default
+        return self[key]
+    
+    def update(self, values: dict):
+        for key, value in values.items():
+            self[key] = value
+            
+    @classmethod
+    def totals(cls, instances: list) -> dict:
+        """Per-field sums across instances, one NumPy reduction per type."""
+        totals = dict.fromkeys(cls.INT_FIELDS + cls.FLOAT_FIELDS, 0)
+        if instances:
+            ints = np.sum([np.frombuffer(i._ints, dtype=np.int64) for i in instances], axis=0)
+            floats = np.sum([np.frombuffer(i._floats, dtype=np.float64) for i in instances], axis=0)
+            totals.update(zip(cls.INT_FIELDS, ints.tolist()))
+            totals.update(zip(cls.FLOAT_FIELDS, floats.tolist()))
+        return totals
+
+
+class WorkerStats(SharedValues):
+    """One worker's stats; written only by that worker."""
+    INT_FIELDS = STAT_COUNTERS
+    FLOAT_FIELDS = STAT_TIMINGS
+
+
+class Thresholds(SharedValues):
+    """Tunable thresholds; written only by the orchestrator."""
+    INT_FIELDS = ('shared_memory_max', 'reread_threshold', 'batch_size', 'disk_io_semaphores')
+    FLOAT_FIELDS = ('batch_wait',)
+
+
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
     signal_name = {2: 'SIGINT (Ctrl+C)', 15: 'SIGTERM'}.get(signum, f'Signal {signum}')
@@ -105,16 +347,76 @@ def signal_handler(signum, frame):
     shutdown_flag.set()
 
 
+# Statements run over and over on the same pooled connections. Each is
+# PREPAREd once per connection so the server skips parse and plan
+PREPARED_STATEMENTS = {
+    'mark_uploaded': """
+        PREPARE mark_uploaded (text[]) AS
+        UPDATE fs
+        SET uploaded = NOW()
+        WHERE blobid = ANY($1) AND uploaded IS NULL
+    """,
+    'reset_stale_claims': """
+        PREPARE reset_stale_claims (int) AS
+        UPDATE work_queue
+        SET claimed_at = NULL, claimed_by = NULL
+        WHERE claimed_at < NOW() - make_interval(mins => $1)
+    """,
+    'remove_completed': """
+        PREPARE remove_completed AS
+        DELETE FROM work_queue wq
+        USING fs
+        WHERE fs.pth = wq.pth
+          AND (fs.blobid IS NOT NULL
+               OR fs.last_missing_at IS NOT NULL
+               OR fs.cantfind = true)
+    """,
+}
+
+
+class PooledConnection(extensions.connection):
+    """Pool connection that remembers which statements it has PREPAREd."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def execute_prepared(cur, name: str, params: tuple = ()):
+    """EXECUTE a PREPARED_STATEMENTS entry, preparing it on first use."""
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(PREPARED_STATEMENTS[name])
+        conn.prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
 def init_connection_pool():
-    """Initialize database connection pool."""
-    global connection_pool
+    """Initialize this process's database connection pool.
+    
+    Every worker process runs one DB call at a time, so a small unlocked
+    pool is enough. Workers are forked after the orchestrator has opened
+    its pool, and closing the inherited connections would send a
+    terminate message down sockets the orchestrator is still using, so a
+    worker just sets them aside (forked workers exit without running
+    finalizers).
+    """
+    global connection_pool, connection_pool_pid
+    if connection_pool is not None and connection_pool_pid != os.getpid():
+        inherited_pools.append(connection_pool)
     conn_string = f"host={DB_HOST} port=5432 user={DB_USER} dbname={DB_NAME} options='-c timezone=America/Los_Angeles'"
-    connection_pool = psycopg2.pool.ThreadedConnectionPool(2, 10, conn_string)
+    connection_pool = psycopg2.pool.SimpleConnectionPool(
+        1, 2, conn_string, connection_factory=PooledConnection
+    )
+    connection_pool_pid = os.getpid()
 
 
 def get_db_connection():
-    """Get connection from pool."""
-    if connection_pool is None:
+    """Get connection from pool, opening this process's own on first use."""
+    if connection_pool is None or connection_pool_pid != os.getpid():
         init_connection_pool()
     return connection_pool.getconn()
 
@@ -125,47 +427,45 @@ def return_db_connection(conn):
         connection_pool.putconn(conn)
 
 
-def claim_work(worker_id: str) -> Optional[tuple]:
-    """Claim a file from work_queue and get its size from fs table."""
+def claim_work(worker_id: str, limit: int = 1) -> List[tuple]:
+    """Claim up to limit files from work_queue, with their sizes from fs."""
     t0 = time.perf_counter()
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
-            # Claim work and get size from fs table in one query
+            # Claim a batch and get sizes from fs table in one query. SKIP
+            # LOCKED lets concurrent workers take disjoint rows straight
+            # off idx_work_queue_claimed, with no sampling or retry
             cur.execute("""
                 WITH claimed AS (
                     UPDATE work_queue
                     SET claimed_at = NOW(), claimed_by = %s
-                    WHERE pth = (
-                        SELECT pth FROM work_queue TABLESAMPLE BERNOULLI(0.1)
+                    WHERE pth IN (
+                        SELECT pth FROM work_queue
                         WHERE claimed_at IS NULL
-                        LIMIT 1
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
                     )
-                    AND claimed_at IS NULL
                     RETURNING pth
                 )
                 SELECT c.pth, f.size 
                 FROM claimed c
                 LEFT JOIN fs f ON c.pth = f.pth
-            """, (worker_id,))
+            """, (worker_id, limit))
             
-            result = cur.fetchone()
+            result = cur.fetchall()
             conn.commit()
             
             # Track latency
             latency_ms = (time.perf_counter() - t0) * 1000
-            if len(db_latencies['claim']) > 1000:  # Keep last 1000
-                db_latencies['claim'].pop(0)
-            db_latencies['claim'].append(latency_ms)
+            db_latencies['claim'].push(latency_ms)
             
-            if result:
-                return (result[0], result[1])  # (path, size)
-            return None
+            return [(pth, size) for pth, size in result]  # (path, size)
                 
     except psycopg2.Error as e:
         logger.error(f"Failed to claim work: {e}")
         conn.rollback()
-        return None
+        return []
     finally:
         return_db_connection(conn)
 
@@ -181,9 +481,7 @@ def check_blob_exists(blob_id: str) -> bool:
             
             # Track latency
             latency_ms = (time.perf_counter() - t0) * 1000
-            if len(db_latencies['dedup']) > 1000:
-                db_latencies['dedup'].pop(0)
-            db_latencies['dedup'].append(latency_ms)
+            db_latencies['dedup'].push(latency_ms)
             
             return result
     except psycopg2.Error as e:
@@ -193,11 +491,110 @@ def check_blob_exists(blob_id: str) -> bool:
         return_db_connection(conn)
 
 
+def check_blobs_exist(blob_ids: List[str]) -> set:
+    """Return the subset of blob_ids already present in the database."""
+    if not blob_ids:
+        return set()
+    t0 = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT blobid FROM fs WHERE blobid = ANY(%s)", (blob_ids,))
+            result = {row[0] for row in cur.fetchall()}
+            
+            # Track latency
+            latency_ms = (time.perf_counter() - t0) * 1000
+            db_latencies['dedup'].push(latency_ms)
+            
+            return result
+    except psycopg2.Error as e:
+        logger.warning(f"Failed to check blob existence: {e}")
+        return set()
+    finally:
+        return_db_connection(conn)
+
+
+def drop_page_cache(file_path: Path):
+    """Evict a file we're done with from the page cache (Linux only).
+    
+    Large files are read once and never again, so letting them sit in the
+    cache only pushes out the small files and metadata that do get reused.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def compress_frame(data: Union[bytes, memoryview, mmap.mmap]) -> bytes:
+    """Compress data into one native LZ4 frame."""
+    return lz4.frame.compress(
+        data,
+        compression_level=0,
+        block_size=lz4.frame.BLOCKSIZE_MAX4MB,
+        block_linked=True,
+    )
+
+
+def compress_threads(workers: int) -> int:
+    """Frame-compression threads each of `workers` compress workers may use.
+    
+    The CPUs are split between the workers running now, not MAX_COMPRESS,
+    and while there are CPUs to spare each worker gets at least 2 - so
+    hosts with fewer than 16 cores still compress large files in parallel.
+    A result of 1 means a single frame.
+    """
+    cpus = os.cpu_count() or 1
+    workers = max(1, workers)
+    threads = min(COMPRESS_MAX_THREADS, cpus // workers)
+    if threads < 2 and cpus > workers:
+        threads = 2
+    return max(1, threads)
+
+
+def scan_staged():
+    """Yield a DirEntry for each blob in the staging tree (AA/BB/blobid).
+    
+    Entries whose names aren't hex blob paths are skipped.
+    
+    os.scandir gets file types from the directory listing itself, so this
+    avoids the Path object and stat call glob makes for every entry.
+    """
+    try:
+        top = os.scandir(STAGING_PATH)
+    except FileNotFoundError:
+        return
+    with top:
+        for prefix in top:
+            if not prefix.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(prefix.path) as prefix_dir:
+                for leaf in prefix_dir:
+                    if not leaf.is_dir(follow_symlinks=False):
+                        continue
+                    with os.scandir(leaf.path) as leaf_dir:
+                        for entry in leaf_dir:
+                            if (entry.is_file(follow_symlinks=False)
+                                    and STAGED_BLOB_RE.fullmatch(f"{prefix.name}/{leaf.name}/{entry.name}")):
+                                yield entry
+
+
 def update_fs_table(path: str, blob_id: str, is_missing: bool = False, mark_uploaded: bool = False):
     """Update fs table with blobid or missing status."""
-    # Use async DB operations when available (except for missing/uploaded flags)
-    if db_ops_queue is not None and not is_missing and not mark_uploaded:
-        db_ops_queue.put(('update_fs', (path, blob_id)))
+    # Use async DB operations when available
+    if db_ops_queue is not None:
+        if is_missing:
+            db_ops_queue.put(('mark_missing', path))
+        elif mark_uploaded:
+            db_ops_queue.put(('mark_uploaded', path))
+        else:
+            db_ops_queue.put(('update_fs', (path, blob_id)))
         return
         
     # Synchronous fallback or for special cases
@@ -254,10 +651,38 @@ def remove_from_queue(path: str):
         return_db_connection(conn)
 
 
+def complete_file(path: str, blob_id: str):
+    """Record blob_id in fs and remove the file from work_queue together."""
+    # Use async DB operations when available
+    if db_ops_queue is not None:
+        db_ops_queue.put(('complete_file', (path, blob_id)))
+        return
+        
+    # Synchronous fallback
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                WITH updated AS (
+                    UPDATE fs SET blobid = %s
+                    WHERE pth = %s
+                    RETURNING fs.pth
+                )
+                DELETE FROM work_queue
+                WHERE pth IN (SELECT pth FROM updated)
+            """, (blob_id, path))
+            conn.commit()
+    except psycopg2.Error as e:
+        logger.error(f"Failed to complete file: {e}")
+        conn.rollback()
+    finally:
+        return_db_connection(conn)
+
+
 class SimpleDBWorker(mp.Process):
     """Simplified DB worker - just handles async DB operations without changing data flow."""
     
-    def __init__(self, worker_id: str, db_ops_queue: mp.Queue, stats: dict):
+    def __init__(self, worker_id: str, db_ops_queue: mp.Queue, stats: WorkerStats):
         super().__init__()
         self.worker_id = worker_id
         self.db_ops_queue = db_ops_queue  # Receives (op_type, data) tuples
@@ -278,48 +703,44 @@ class SimpleDBWorker(mp.Process):
         logger.info(f"SimpleDBWorker {self.worker_id} started")
         init_connection_pool()
         
-        update_batch = []  # For fs table updates
-        remove_batch = []  # For work_queue removals
+        # One pending batch per op type, each flushed by its own batched
+        # statement
+        flushers = {
+            'update_fs': self.flush_updates,
+            'complete_file': self.flush_completions,
+            'remove_queue': self.flush_removals,
+            'mark_missing': self.flush_missing,
+            'mark_uploaded': self.flush_uploaded,
+        }
+        batches = {op_type: [] for op_type in flushers}
         last_flush = time.time()
         
         while not self.stop_flag.is_set() and not shutdown_flag.is_set():
-            # Collect operations
+            # Block until an op arrives; the timeout bounds flush latency
             try:
-                while not self.db_ops_queue.empty():
-                    op_type, data = self.db_ops_queue.get_nowait()
-                    
-                    if op_type == 'update_fs':
-                        update_batch.append(data)
-                    elif op_type == 'remove_queue':
-                        remove_batch.append(data)
-                    
-                    # Flush if batch is full
-                    if len(update_batch) >= self.batch_size:
-                        self.flush_updates(update_batch)
-                        update_batch = []
-                    if len(remove_batch) >= self.batch_size:
-                        self.flush_removals(remove_batch)
-                        remove_batch = []
-            except:
+                op_type, data = self.db_ops_queue.get(timeout=0.5)
+                batch = batches[op_type]
+                batch.append(data)
+                
+                # Flush if batch is full
+                if len(batch) >= self.batch_size:
+                    flushers[op_type](batch)
+                    batches[op_type] = []
+            except Empty:
                 pass
             
             # Flush on timeout
             if time.time() - last_flush > 0.5:
-                if update_batch:
-                    self.flush_updates(update_batch)
-                    update_batch = []
-                if remove_batch:
-                    self.flush_removals(remove_batch)
-                    remove_batch = []
+                for op_type, batch in batches.items():
+                    if batch:
+                        flushers[op_type](batch)
+                        batches[op_type] = []
                 last_flush = time.time()
-                
-            time.sleep(0.01)
             
         # Final flush
-        if update_batch:
-            self.flush_updates(update_batch)
-        if remove_batch:
-            self.flush_removals(remove_batch)
+        for op_type, batch in batches.items():
+            if batch:
+                flushers[op_type](batch)
             
         logger.info(f"SimpleDBWorker {self.worker_id} stopped")
         
@@ -331,16 +752,47 @@ class SimpleDBWorker(mp.Process):
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                for path, blob_id in batch:
-                    cur.execute("""
-                        UPDATE fs SET blobid = %s
-                        WHERE pth = %s
-                    """, (blob_id, path))
+                # One statement for the whole batch instead of one per row
+                execute_values(cur, """
+                    UPDATE fs SET blobid = data.blob
+                    FROM (VALUES %s) AS data(pth, blob)
+                    WHERE fs.pth = data.pth
+                """, batch, page_size=len(batch))
+                conn.commit()
+                self.stats['db_updates'] = self.stats.get('db_updates', 0) + len(batch)
+                    
+        except psycopg2.Error as e:
+            logger.error(f"Batch update failed: {e}")
+            conn.rollback()
+        finally:
+            return_db_connection(conn)
+            
+    def flush_completions(self, batch: list):
+        """Batch set blobid and drop the work_queue rows in one statement."""
+        if not batch:
+            return
+            
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                # Only rows whose fs update landed leave the queue, and both
+                # commit together
+                execute_values(cur, """
+                    WITH updated AS (
+                        UPDATE fs SET blobid = data.blob
+                        FROM (VALUES %s) AS data(pth, blob)
+                        WHERE fs.pth = data.pth
+                        RETURNING fs.pth
+                    )
+                    DELETE FROM work_queue
+                    WHERE pth IN (SELECT pth FROM updated)
+                """, batch, page_size=len(batch))
                 conn.commit()
                 self.stats['db_updates'] = self.stats.get('db_updates', 0) + len(batch)
+                self.stats['db_removals'] = self.stats.get('db_removals', 0) + len(batch)
                     
         except psycopg2.Error as e:
-            logger.error(f"Batch claim failed: {e}")
+            logger.error(f"Batch completion failed: {e}")
             conn.rollback()
         finally:
             return_db_connection(conn)
@@ -365,18 +817,64 @@ class SimpleDBWorker(mp.Process):
             conn.rollback()
         finally:
             return_db_connection(conn)
+            
+    def flush_missing(self, batch: list):
+        """Batch mark files as missing in fs table."""
+        if not batch:
+            return
+            
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE fs 
+                    SET cantfind = true, 
+                        last_missing_at = NOW()
+                    WHERE pth = ANY(%s)
+                """, (batch,))
+                conn.commit()
+                        
+        except psycopg2.Error as e:
+            logger.error(f"Batch missing update failed: {e}")
+            conn.rollback()
+        finally:
+            return_db_connection(conn)
+            
+    def flush_uploaded(self, batch: list):
+        """Batch mark files as uploaded in fs table."""
+        if not batch:
+            return
+            
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE fs 
+                    SET uploaded = NOW()
+                    WHERE pth = ANY(%s)
+                """, (batch,))
+                conn.commit()
+                        
+        except psycopg2.Error as e:
+            logger.error(f"Batch uploaded update failed: {e}")
+            conn.rollback()
+        finally:
+            return_db_connection(conn)
 
 
 class HashWorker(mp.Process):
     """Read files, hash them, check dedup, pass to compress if needed."""
     
-    def __init__(self, worker_id: str, compress_queue: mp.Queue, thresholds: dict, stats: dict):
+    def __init__(self, worker_id: str, compress_queue: mp.Queue, thresholds: Thresholds, stats: WorkerStats,
+                 shm_pool: Optional[mp.Queue] = None):
         super().__init__()
         self.worker_id = worker_id
         self.compress_queue = compress_queue
+        self.shm_pool = shm_pool  # Names of free pooled segments
+        self._shm_attached = {}  # Pooled segments this process has mapped
         self.thresholds = thresholds
         self.stop_flag = mp.Event()
-        self.stats = stats  # Shared manager dict
+        self.stats = stats  # Shared WorkerStats
         # Initialize timing stats
         self.stats['read_time_ms'] = 0
         self.stats['hash_time_ms'] = 0
@@ -386,6 +884,14 @@ class HashWorker(mp.Process):
         self.stats['bytes_read'] = 0
         self.stats['files_reread'] = 0  # Track files that need rereading
         self.stats['files_in_memory'] = 0  # Track files passed via shared memory
+        self._local_stats = {}  # Running totals, published to stats per batch
+        self.claim_batch = 16
+        self._claim_buf = deque()  # Claimed (path, size) not yet processed
+        self._dedup_pending = []  # (path, blob_id, size, data) awaiting dedup
+        self._dedup_bytes = 0  # Small-file bytes held in _dedup_pending
+        self._dedup_cache = OrderedDict()  # LRU of blob_ids known to exist
+        self.read_latencies = LatencyWindow(100)  # Small-file read times, for thrashing detection
+        self.refresh_thresholds()
         
     def run(self):
         """Main worker loop."""
@@ -400,9 +906,14 @@ class HashWorker(mp.Process):
         logger.info(f"HashWorker {self.worker_id} started")
         init_connection_pool()
         
+        # One hasher per path, reset between files instead of reallocated.
+        # Built here rather than in __init__ so the worker stays picklable
+        self._hasher = blake3.blake3()
+        self._large_hasher = blake3.blake3(max_threads=LARGE_HASH_THREADS)
+        
         while not self.stop_flag.is_set() and not shutdown_flag.is_set():
             # Claim work
-            claim_result = claim_work(self.worker_id)
+            claim_result = self.next_claim()
             if not claim_result:
                 time.sleep(1)
                 continue
@@ -413,14 +924,82 @@ class HashWorker(mp.Process):
                 self.process_file(path, expected_size)
             except Exception as e:
                 logger.error(f"Error processing {path}: {e}")
+            
+            # Settle dedup once per claimed batch (or sooner if we're
+            # holding a lot of small-file data)
+            if not self._claim_buf or self._dedup_bytes >= DEDUP_BATCH_BYTES:
+                self.flush_dedup()
+                self.publish_stats()
                 
         logger.info(f"HashWorker {self.worker_id} stopping...")
+        self.flush_dedup()
+        self.publish_stats()
         self.cleanup()
         logger.info(f"HashWorker {self.worker_id} stopped")
         
+    def next_claim(self) -> Optional[tuple]:
+        """Pop the next claimed file, refilling the local batch when empty."""
+        if not self._claim_buf:
+            self.refresh_thresholds()
+            claims = claim_work(self.worker_id, self.claim_batch)
+            self.prefetch(claims)
+            self._claim_buf.extend(claims)
+        if self._claim_buf:
+            return self._claim_buf.popleft()
+        return None
+        
+    def refresh_thresholds(self):
+        """Snapshot the size cutoffs used to route files.
+        
+        The orchestrator retunes thresholds at runtime; reading them once
+        per claimed batch keeps the shared lookups off the per-file path.
+        """
+        self._shm_max = self.thresholds.get('shared_memory_max', 10_000_000)
+        self._reread_max = self.thresholds.get('reread_threshold', 50_000_000)
+        
+    def bump(self, key: str, value=1):
+        """Add to a worker-local stat; see publish_stats."""
+        self._local_stats[key] = self._local_stats.get(key, 0) + value
+        
+    def publish_stats(self):
+        """Copy local totals into the shared stats once per batch."""
+        if self._local_stats:
+            self.stats.update(self._local_stats)
+        
+    def fresh_hasher(self, large: bool = False):
+        """Return this worker's reusable hasher, reset for a new file."""
+        attr = '_large_hasher' if large else '_hasher'
+        hasher = getattr(self, attr)
+        try:
+            hasher.reset()
+        except AttributeError:  # Older blake3 bindings have no reset()
+            hasher = blake3.blake3(max_threads=LARGE_HASH_THREADS) if large else blake3.blake3()
+            setattr(self, attr, hasher)
+        return hasher
+        
+    def prefetch(self, claims: list):
+        """Ask the kernel to start reading a freshly claimed batch.
+        
+        The reads are queued together, so the disk sees the whole batch
+        while earlier files are still being hashed. Linux only; elsewhere
+        this is a no-op.
+        """
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        for path, size in claims:
+            if size is None or size > self.thresholds.get('reread_threshold', 50_000_000):
+                continue  # Large files are streamed; don't flood the cache
+            try:
+                fd = os.open(Path("/Volumes") / path, os.O_RDONLY)
+            except OSError:
+                continue  # Missing files are handled in process_file
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        
     def process_file(self, path: str, expected_size: Optional[int]):
         """Process a single file."""
-        file_start = time.perf_counter()
         file_path = Path("/Volumes") / path
         
         # Check existence
@@ -434,22 +1013,21 @@ class HashWorker(mp.Process):
             return
             
         # Get file size and verify it matches database
-        t0 = time.perf_counter()
         size = file_path.stat().st_size
         if expected_size is not None and size != expected_size:
             logger.warning(f"Size mismatch for {path}: disk={size} db={expected_size}")
-        self.stats['bytes_hashed'] = self.stats.get('bytes_hashed', 0) + size
-        self.stats['bytes_read'] = self.stats.get('bytes_read', 0) + size
+        self.bump('bytes_hashed', size)
+        self.bump('bytes_read', size)
         
         # Decide strategy based on size and thresholds
-        if size <= self.thresholds.get('shared_memory_max', 10_000_000):
+        if size <= self._shm_max:
             self.process_small_file(path, file_path, size)
-        elif size <= self.thresholds.get('reread_threshold', 50_000_000):
+        elif size <= self._reread_max:
             self.process_medium_file(path, file_path, size)
         else:
             self.process_large_file(path, file_path, size)
             
-        self.stats['files_processed'] = self.stats.get('files_processed', 0) + 1
+        self.bump('files_processed', 1)
         
     def process_small_file(self, path: str, file_path: Path, size: int):
         """Small file: read once, pass through shared memory if needed."""
@@ -458,89 +1036,175 @@ class HashWorker(mp.Process):
         with disk_io_semaphore:  # Prevent disk thrashing
             data = file_path.read_bytes()
         read_time = (time.perf_counter() - t0) * 1000
-        self.stats['read_time_ms'] = self.stats.get('read_time_ms', 0) + read_time
+        self.bump('read_time_ms', read_time)
         
         # Track read latency for thrashing detection
-        global disk_read_latencies
-        disk_read_latencies.append(read_time)
-        if len(disk_read_latencies) > 100:  # Keep last 100 readings
-            disk_read_latencies.pop(0)
+        self.read_latencies.push(read_time)
         
         # Time hashing
         t0 = time.perf_counter()
-        blob_id = blake3.blake3(data).hexdigest()
+        hasher = self.fresh_hasher()
+        hasher.update(data)
+        blob_id = hasher.hexdigest()
         hash_time = (time.perf_counter() - t0) * 1000
-        self.stats['hash_time_ms'] = self.stats.get('hash_time_ms', 0) + hash_time
+        self.bump('hash_time_ms', hash_time)
+        
+        # Dedup is checked for the whole batch in flush_dedup
+        self._dedup_pending.append((path, blob_id, size, data))
+        self._dedup_bytes += size
         
-        # Time dedup check
+    def flush_dedup(self):
+        """Check the pending batch against the DB in one query and route it."""
+        if not self._dedup_pending:
+            return
+        pending = self._dedup_pending
+        self._dedup_pending = []
+        self._dedup_bytes = 0
+        
+        # Time dedup check; only ids the cache can't answer go to the DB
         t0 = time.perf_counter()
-        exists = check_blob_exists(blob_id)
+        unknown = {blob_id for _, blob_id, _, _ in pending if blob_id not in self._dedup_cache}
+        existing = check_blobs_exist(list(unknown)) if unknown else set()
+        for blob_id in existing:
+            self.remember_blob(blob_id)
         dedup_time = (time.perf_counter() - t0) * 1000
-        self.stats['dedup_time_ms'] = self.stats.get('dedup_time_ms', 0) + dedup_time
+        self.bump('dedup_time_ms', dedup_time)
         
-        if exists:
-            update_fs_table(path, blob_id)
-            remove_from_queue(path)
-            self.stats['dedup_hits'] = self.stats.get('dedup_hits', 0) + 1
-            return
-            
+        for path, blob_id, size, data in pending:
+            try:
+                if blob_id in existing or blob_id in self._dedup_cache:
+                    self.remember_blob(blob_id)
+                    complete_file(path, blob_id)
+                    self.bump('dedup_hits', 1)
+                elif data is not None:
+                    self.queue_small_file(path, blob_id, size, data)
+                else:
+                    self.queue_reread(path, blob_id, size)
+            except Exception as e:
+                logger.error(f"Error processing {path}: {e}")
+                
+    def remember_blob(self, blob_id: str):
+        """Record blob_id as existing, evicting the least recently seen."""
+        self._dedup_cache[blob_id] = None
+        self._dedup_cache.move_to_end(blob_id)
+        if len(self._dedup_cache) > DEDUP_CACHE_SIZE:
+            self._dedup_cache.popitem(last=False)
+            
+    def queue_small_file(self, path: str, blob_id: str, size: int, data: bytes):
+        """Hand a small file's bytes to compress via shared memory."""
         # Time queue operation
         t0 = time.perf_counter()
         
         # Pass to compress via shared memory
+        shm, pooled = self.acquire_shm(size)
         try:
-            shm = shared_memory.SharedMemory(create=True, size=size)
             shm.buf[:size] = data
             
-            # Track shared memory usage
-            if 'shm_metrics' not in self.stats:
-                self.stats['shm_metrics'] = {}
-            self.stats['shm_metrics']['active_segments'] = self.stats.get('shm_metrics', {}).get('active_segments', 0) + 1
-            self.stats['shm_metrics']['total_bytes'] = self.stats.get('shm_metrics', {}).get('total_bytes', 0) + size
+            if not pooled:
+                # Track shared memory usage
+                self.bump('shm_active_segments', 1)
+                self.bump('shm_total_bytes', size)
             
             self.compress_queue.put({
                 'path': path,
                 'blob_id': blob_id,
                 'shm_name': shm.name,
+                'shm_pooled': pooled,
                 'size': size,
                 'method': 'shared_memory'
             }, timeout=30)
-            self.stats['files_in_memory'] = self.stats.get('files_in_memory', 0) + 1
+            self.bump('files_in_memory', 1)
             
             queue_time = (time.perf_counter() - t0) * 1000
-            self.stats['queue_time_ms'] = self.stats.get('queue_time_ms', 0) + queue_time
-            
-            shm.close()
+            self.bump('queue_time_ms', queue_time)
             
         except Full:
-            logger.warning(f"Compress queue full, waiting...")
+            logger.warning("Compress queue full, waiting...")
+            self.release_shm(shm, pooled)
             time.sleep(1)
+            return
         except Exception as e:
             logger.error(f"Shared memory error: {e}")
+            self.release_shm(shm, pooled)
+            return
+        
+        if not pooled:
+            shm.close()
+            
+    def acquire_shm(self, size: int) -> tuple:
+        """Get a segment for size bytes: pooled if possible, else dedicated."""
+        if self.shm_pool is not None and size <= SHM_SEGMENT_SIZE:
+            try:
+                name = self.shm_pool.get_nowait()
+                if name not in self._shm_attached:
+                    self._shm_attached[name] = shared_memory.SharedMemory(name=name)
+                return self._shm_attached[name], True
+            except Empty:
+                pass
+        return shared_memory.SharedMemory(create=True, size=max(1, size)), False
+        
+    def release_shm(self, shm, pooled: bool):
+        """Give back a segment that never reached a compress worker."""
+        if pooled:
+            self.shm_pool.put(shm.name)
+        else:
+            shm.close()
+            shm.unlink()
             
     def cleanup(self):
         """Clean up resources on shutdown."""
-        pass
+        # Hand back claims we never got to, rather than leaving them for
+        # the stale-claim reset
+        if not self._claim_buf:
+            return
+        paths = [path for path, _ in self._claim_buf]
+        self._claim_buf.clear()
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE work_queue
+                    SET claimed_at = NULL, claimed_by = NULL
+                    WHERE pth = ANY(%s) AND claimed_by = %s
+                """, (paths, self.worker_id))
+                conn.commit()
+        except psycopg2.Error as e:
+            logger.error(f"Failed to release claims: {e}")
+            conn.rollback()
+        finally:
+            return_db_connection(conn)
             
     def process_medium_file(self, path: str, file_path: Path, size: int):
         """Medium file: hash first, reread if needed."""
-        # Stream hash with I/O coordination
-        hasher = blake3.blake3()
-        with disk_io_semaphore:  # Prevent disk thrashing
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(1_000_000):
-                    hasher.update(chunk)
-                
+        # Hash straight from an mmap of the file: no userspace copy per
+        # chunk, and BLAKE3 sees the whole input at once
+        hasher = self.fresh_hasher()
+        self.hash_mapped(hasher, file_path)
         blob_id = hasher.hexdigest()
         
-        # Check dedup
-        if check_blob_exists(blob_id):
-            update_fs_table(path, blob_id)
-            remove_from_queue(path)
-            self.stats['dedup_hits'] = self.stats.get('dedup_hits', 0) + 1
-            return
-            
-        # Queue for compress (will reread)
+        # Dedup is checked for the whole batch in flush_dedup
+        self._dedup_pending.append((path, blob_id, size, None))
+        
+    def hash_mapped(self, hasher, file_path: Path):
+        """Hash a file through an mmap, timed as read vs hash.
+        
+        The reads happen as page faults inside the hash, so the time is
+        split by CPU: CPU time is hashing, the rest of the wall time is
+        waiting on the disk (including for the semaphore, as for small
+        files).
+        """
+        t0 = time.perf_counter()
+        cpu0 = time.process_time()
+        with disk_io_semaphore:  # Prevent disk thrashing
+            hasher.update_mmap(str(file_path))
+        wall_ms = (time.perf_counter() - t0) * 1000
+        # Large files hash on several threads, so CPU can exceed wall time
+        hash_ms = min(wall_ms, (time.process_time() - cpu0) * 1000)
+        self.bump('hash_time_ms', hash_ms)
+        self.bump('read_time_ms', wall_ms - hash_ms)
+        
+    def queue_reread(self, path: str, blob_id: str, size: int):
+        """Queue a medium file for compress, which rereads it from disk."""
         try:
             self.compress_queue.put({
                 'path': path,
@@ -548,29 +1212,29 @@ class HashWorker(mp.Process):
                 'size': size,
                 'method': 'reread'
             }, timeout=30)
-            self.stats['files_reread'] = self.stats.get('files_reread', 0) + 1
+            self.bump('files_reread', 1)
         except Full:
-            logger.warning(f"Compress queue full")
+            logger.warning("Compress queue full")
             
     def process_large_file(self, path: str, file_path: Path, size: int):
         """Large file: stream everything."""
-        # Stream hash with I/O coordination
-        hasher = blake3.blake3()
-        with disk_io_semaphore:  # Prevent disk thrashing
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(1_000_000):
-                    hasher.update(chunk)
-                
+        # Hash straight from an mmap of the file: no userspace copy per
+        # chunk, and BLAKE3 sees the whole input at once. Large files are
+        # also split across threads; medium/small stay single-threaded
+        hasher = self.fresh_hasher(large=True)
+        self.hash_mapped(hasher, file_path)
         blob_id = hasher.hexdigest()
         
         # Check dedup
-        if check_blob_exists(blob_id):
-            update_fs_table(path, blob_id)
-            remove_from_queue(path)
-            self.stats['dedup_hits'] = self.stats.get('dedup_hits', 0) + 1
+        if blob_id in self._dedup_cache or check_blob_exists(blob_id):
+            self.remember_blob(blob_id)
+            complete_file(path, blob_id)
+            self.bump('dedup_hits', 1)
+            # Nothing will read it again; keep the cache for hotter data
+            drop_page_cache(file_path)
             return
             
-        # Queue for stream processing
+        # Queue for stream processing (left cached: compress rereads it)
         try:
             self.compress_queue.put({
                 'path': path,
@@ -579,23 +1243,32 @@ class HashWorker(mp.Process):
                 'method': 'stream'
             }, timeout=30)
         except Full:
-            logger.warning(f"Compress queue full")
+            logger.warning("Compress queue full")
 
 
 class CompressWorker(mp.Process):
     """Compress and stage blobs."""
     
-    def __init__(self, worker_id: str, compress_queue: mp.Queue, stats: dict):
+    def __init__(self, worker_id: str, compress_queue: mp.Queue, stats: WorkerStats,
+                 shm_pool: Optional[mp.Queue] = None, staged_count=None,
+                 compress_count=None):
         super().__init__()
         self.worker_id = worker_id
         self.compress_queue = compress_queue
+        self.compress_count = compress_count  # Shared count of compress workers
+        self.shm_pool = shm_pool  # Pooled segments go back here when done
+        self.staged_count = staged_count  # Shared count of staged blobs
+        self._shm_attached = {}  # Pooled segments this process has mapped
         self.stop_flag = mp.Event()
-        self.stats = stats  # Shared manager dict
+        self.stats = stats  # Shared WorkerStats
         # Initialize timing stats
         self.stats['wait_time_ms'] = 0
         self.stats['work_time_ms'] = 0
         self.stats['items_processed'] = 0
         self.stats['idle_cycles'] = 0
+        self._known_dirs = set()  # AA/BB staging dirs already created
+        self.frame_pool = None  # Threads for large blobs, started in run()
+        self._scratch = None  # page_in's read buffer, allocated on first use
         
     def run(self):
         """Main worker loop."""
@@ -610,6 +1283,8 @@ class CompressWorker(mp.Process):
         logger.info(f"CompressWorker {self.worker_id} started")
         init_connection_pool()
         self.active_shm = set()  # Track active shared memory segments
+        # Created after fork: threads don't survive into a child process
+        self.frame_pool = ThreadPoolExecutor(COMPRESS_MAX_THREADS)
         
         while not self.stop_flag.is_set() and not shutdown_flag.is_set():
             t0 = time.perf_counter()
@@ -642,115 +1317,180 @@ class CompressWorker(mp.Process):
         size = item['size']
         method = item['method']
         
+        # Get file metadata
+        file_path = Path("/Volumes") / path
+        mtime = file_path.stat().st_mtime if file_path.exists() else time.time()
+        
         # Get data based on method
         if method == 'shared_memory':
             # Get from shared memory
+            name = item['shm_name']
+            pooled = item.get('shm_pooled', False)
             try:
-                shm = shared_memory.SharedMemory(name=item['shm_name'])
-                self.active_shm.add(item['shm_name'])  # Track for cleanup
-                data = bytes(shm.buf[:size])
-                shm.close()
-                shm.unlink()  # Clean up
-                self.active_shm.discard(item['shm_name'])
+                if pooled:
+                    if name not in self._shm_attached:
+                        self._shm_attached[name] = shared_memory.SharedMemory(name=name)
+                    shm = self._shm_attached[name]
+                else:
+                    shm = shared_memory.SharedMemory(name=name)
+                    self.active_shm.add(name)  # Track for cleanup
             except Exception as e:
                 logger.error(f"Shared memory error: {e}")
                 return
+            try:
+                # Compress straight out of the segment - no bytes() copy.
+                # The view must be released before the segment is closed
+                with shm.buf[:size] as data:
+                    compressed = self.compress_data(data, path, mtime)
+            finally:
+                if pooled:
+                    self.shm_pool.put(name)  # Back to the pool for reuse
+                else:
+                    shm.close()
+                    shm.unlink()  # Clean up
+                    self.active_shm.discard(name)
                 
         elif method == 'reread':
             # Read from disk with I/O coordination
-            file_path = Path("/Volumes") / path
             if not file_path.exists():
                 logger.warning(f"File disappeared: {path}")
                 remove_from_queue(path)
                 return
-            with disk_io_semaphore:  # Prevent disk thrashing
-                data = file_path.read_bytes()
+            compressed = self.compress_file(file_path, path, mtime)
             
         elif method == 'stream':
             # Stream compress (TODO: implement streaming)
-            file_path = Path("/Volumes") / path
             if not file_path.exists():
                 logger.warning(f"File disappeared: {path}")
                 remove_from_queue(path)
                 return
-            with disk_io_semaphore:  # Prevent disk thrashing
-                data = file_path.read_bytes()
-            
-        # Get file metadata
-        file_path = Path("/Volumes") / path
-        mtime = file_path.stat().st_mtime if file_path.exists() else time.time()
-        
-        # Compress with metadata
-        compressed = self.compress_data(data, path, mtime)
+            compressed = self.compress_file(file_path, path, mtime)
+            drop_page_cache(file_path)  # Last read of this large file
         
         # Stage for upload
         self.stage_blob(blob_id, compressed)
         
         # Update database
-        update_fs_table(path, blob_id)
-        remove_from_queue(path)
+        complete_file(path, blob_id)
         
         self.stats['files_compressed'] = self.stats.get('files_compressed', 0) + 1
         self.stats['bytes_compressed'] = self.stats.get('bytes_compressed', 0) + size
         
-    def compress_data(self, data: bytes, path: str, mtime: float) -> bytes:
-        """Compress and wrap data as JSON blob with proper metadata."""
+    def compress_file(self, file_path: Path, path: str, mtime: float) -> bytes:
+        """Compress a file straight from an mmap of it.
+        
+        LZ4 reads the mapping directly rather than a bytes copy of the
+        whole file. The file is paged in under disk_io_semaphore first, so
+        the CPU-bound compression runs without holding it.
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return self.compress_data(b"", path, mtime)  # Empty files can't be mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                with disk_io_semaphore:  # Prevent disk thrashing
+                    self.page_in(f, data)
+                return self.compress_data(data, path, mtime)
+                
+    def page_in(self, f, data: mmap.mmap):
+        """Read a mapped file into the page cache before compressing it."""
+        if hasattr(mmap, 'MADV_POPULATE_READ'):  # Python 3.13+, Linux 5.14+
+            try:
+                data.madvise(mmap.MADV_POPULATE_READ)
+                return
+            except OSError:
+                pass  # Older kernel: fall back to reading it
+        # A plain read pass, into a reused scratch buffer. MADV_WILLNEED
+        # alone would return before the I/O is done
+        if self._scratch is None:
+            self._scratch = bytearray(PAGE_IN_CHUNK)
+        while f.readinto(self._scratch):
+            pass
+                
+    def compress_data(self, data: Union[bytes, memoryview, mmap.mmap], path: str, mtime: float) -> bytes:
+        """Compress data into a binary blob with proper metadata."""
         # Detect file type using python-magic (if available)
-        try:
-            import magic
-            mime = magic.from_buffer(data[:8192], mime=True)  # Check first 8KB
-        except ImportError:
-            mime = "application/octet-stream"
-        except Exception:
-            mime = "application/octet-stream"
-            
-        # Compress with LZ4
-        frames = []
-        CHUNK_SIZE = 10 * 1024 * 1024  # 10MB chunks
-        
-        offset = 0
-        while offset < len(data):
-            chunk = data[offset:offset + CHUNK_SIZE]
-            compressed = lz4.frame.compress(chunk)
-            import base64
-            b64_frame = base64.b64encode(compressed).decode('ascii')
-            frames.append(b64_frame)
-            offset += CHUNK_SIZE
-            
-        # Create JSON blob with full metadata
-        blob = {
-            "content": {
-                "encoding": "lz4-multiframe",
-                "frames": frames
-            },
-            "metadata": {
-                "path": path,  # Original path for recovery/debugging
-                "size": len(data),
-                "mtime": mtime,  # Actual file mtime
-                "filetype": mime,  # Detected MIME type
-                "encryption": False
-            }
-        }
-        
-        return json.dumps(blob).encode('utf-8')
+        mime = "application/octet-stream"
+        if magic is not None:
+            try:
+                mime = magic.from_buffer(bytes(data[:8192]), mime=True)  # Check first 8KB
+            except Exception:
+                pass
+            
+        # Binary container (see blob_format.py): metadata header followed
+        # by one native LZ4 frame - no base64, no JSON-wrapped frames
+        header = pack_header({
+            "path": path,  # Original path for recovery/debugging
+            "size": len(data),
+            "mtime": mtime,  # Actual file mtime
+            "filetype": mime,  # Detected MIME type
+            "encryption": False
+        })
+        return header + self.compress_frames(data)
+        
+    def compress_frames(self, data: Union[bytes, memoryview, mmap.mmap]) -> bytes:
+        """LZ4-compress data; large inputs become independent frames compressed in parallel."""
+        # Sized from the workers running now, so the tuner adding or
+        # removing compress workers takes effect on the next blob
+        threads = compress_threads(self.compress_count.value if self.compress_count is not None else 1)
+        if self.frame_pool is None or threads < 2 or len(data) <= COMPRESS_FRAME_SIZE:
+            return compress_frame(data)
+        
+        # Concatenated frames decode as one stream (see blob_format.py).
+        # The slices must be released before an mmap under them is closed
+        with memoryview(data) as view:
+            chunks = [view[i:i + COMPRESS_FRAME_SIZE] for i in range(0, len(view), COMPRESS_FRAME_SIZE)]
+            try:
+                # At most `threads` frames in flight at once
+                frames = []
+                for i in range(0, len(chunks), threads):
+                    frames.extend(self.frame_pool.map(compress_frame, chunks[i:i + threads]))
+            finally:
+                for chunk in chunks:
+                    chunk.release()
+        return b"".join(frames)
         
     def stage_blob(self, blob_id: str, data: bytes):
         """Stage blob to disk for batch upload."""
-        AA = blob_id[:2]
-        BB = blob_id[2:4]
-        
-        # Create directory structure
-        staging_dir = Path(STAGING_PATH) / AA / BB
-        staging_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Write blob
-        blob_path = staging_dir / blob_id
-        blob_path.write_bytes(data)
+        staging_dir = f"{STAGING_PATH}/{blob_id[:2]}/{blob_id[2:4]}"
+        
+        # Create directory structure, once per AA/BB prefix (rsync removes
+        # uploaded files but leaves the directories)
+        if staging_dir not in self._known_dirs:
+            os.makedirs(staging_dir, exist_ok=True)
+            self._known_dirs.add(staging_dir)
+        
+        # Write blob. The same blob_id can be staged again before it is
+        # uploaded (duplicate content in one dedup batch); only a new file
+        # counts, as uploads subtract once per blob_id
+        blob_path = f"{staging_dir}/{blob_id}"
+        while True:
+            try:
+                fd = os.open(blob_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                is_new = True
+                break
+            except FileExistsError:
+                pass
+            try:
+                fd = os.open(blob_path, os.O_WRONLY | os.O_TRUNC)
+                is_new = False
+                break
+            except FileNotFoundError:
+                continue  # Uploaded and removed in between; stage it anew
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
         
-        # Blob staged successfully
+        if is_new and self.staged_count is not None:
+            with self.staged_count.get_lock():
+                self.staged_count.value += 1
         
     def cleanup(self):
         """Clean up any remaining shared memory segments."""
+        if self.frame_pool is not None:
+            self.frame_pool.shutdown()
         for shm_name in self.active_shm:
             try:
                 shm = shared_memory.SharedMemory(name=shm_name)
@@ -763,14 +1503,23 @@ class CompressWorker(mp.Process):
 class UploadWorker(mp.Process):
     """Batch upload staged blobs."""
     
-    def __init__(self, worker_id: str, thresholds: dict):
+    def __init__(self, worker_id: str, thresholds: Thresholds, staged_count=None,
+                 slot: int = 0, prefix_owners=None, owners_version=None):
         super().__init__()
         self.worker_id = worker_id
         self.thresholds = thresholds
+        self.staged_count = staged_count  # Shared count of staged blobs
+        self.slot = slot  # Which upload worker this is, for prefix_owners
+        self.prefix_owners = prefix_owners  # AA prefix -> owning slot
+        self.owners_version = owners_version  # Bumped when prefixes move
         self.stop_flag = mp.Event()
-        self.pending = []  # List of (rel_path, full_path) tuples
-        self.collected = set()  # Track what we've already collected
+        self.pending = []  # List of (rel_path, full_path, blob_id) tuples
+        self.collected = set()  # Blob_id prefixes (as ints) already collected
+        self.failures = {}  # Blob_id prefix -> failed rsyncs so far
+        self.rescan = True  # Walk staging on the next loop (inotify mode)
         self.last_upload = time.time()
+        self._inotify = None  # Set up in run() where available
+        self._watch_dirs = {}  # inotify watch descriptor -> directory
         
     def run(self):
         """Main worker loop."""
@@ -783,10 +1532,36 @@ class UploadWorker(mp.Process):
                 format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <level>{message}</level>"
             )
         logger.info(f"UploadWorker {self.worker_id} started")
+        init_connection_pool()
         self.total_uploaded = 0
         
+        # Open the shared ssh connection up front so the first batch
+        # doesn't pay for it
+        self.prewarm_ssh()
+        
+        # Follow kernel events for new blobs where inotify is available,
+        # then pick up whatever is already staged. Watching first means a
+        # blob finished mid-scan is seen by one or the other (or both -
+        # self.collected drops the repeat)
+        self.watch_staging()
+        seen_version = self.owners_version.value if self.owners_version else 0
+        
         while not self.stop_flag.is_set() and not shutdown_flag.is_set():
-            self.collect_staged()
+            # Prefixes handed over from another worker hold blobs no event
+            # will report
+            if self.owners_version and self.owners_version.value != seen_version:
+                seen_version = self.owners_version.value
+                self.rescan = True
+                
+            if self._inotify:
+                self.collect_events(timeout_ms=500)
+                # Events only cover new blobs; a rescan (at startup, after
+                # failures or a handover) runs until it gets through the
+                # whole tree without hitting the pending cap
+                if self.rescan:
+                    self.rescan = not self.collect_staged()
+            else:
+                self.collect_staged()
             
             # Upload if batch ready or timeout
             if len(self.pending) >= self.thresholds.get('batch_size', 100):
@@ -795,7 +1570,8 @@ class UploadWorker(mp.Process):
                 if self.pending:
                     self.upload_batch()
                     
-            time.sleep(0.5)
+            if not self._inotify:
+                time.sleep(0.5)
             
         # Final upload on shutdown
         logger.info(f"UploadWorker {self.worker_id} flushing {len(self.pending)} pending files...")
@@ -804,96 +1580,225 @@ class UploadWorker(mp.Process):
             
         logger.info(f"UploadWorker {self.worker_id} stopped (uploaded {self.total_uploaded} total)")
         
-    def collect_staged(self):
-        """Collect newly staged files."""
-        staging_path = Path(STAGING_PATH)
+    def collect_staged(self) -> bool:
+        """Collect newly staged files; True if the whole tree was walked."""
+        prefix_len = len(STAGING_PATH) + 1
         
-        for blob_path in staging_path.glob("*/*/*"):
-            if blob_path.is_file():
-                # Skip if already collected
-                path_str = str(blob_path)
-                if path_str in self.collected:
-                    continue
-                    
-                # Mark as collected and add to pending with full path for DB update
-                self.collected.add(path_str)
-                rel_path = blob_path.relative_to(staging_path)
-                # Store both relative path (for rsync) and full path (to extract pth for DB)
-                self.pending.append((str(rel_path), str(blob_path)))
+        for entry in scan_staged():
+            self.collect(entry.path[prefix_len:], entry.path, entry.name)
+            
+            # Don't collect too many at once
+            if len(self.pending) >= self.thresholds.get('batch_size', 100) * 2:
+                return False
+        return True
+                
+    def owns(self, rel_path: str) -> bool:
+        """True if this worker uploads the AA prefix rel_path is under."""
+        if self.prefix_owners is None:
+            return True
+        return self.prefix_owners[int(rel_path[:2], 16)] == self.slot
                 
-                # Don't collect too many at once
-                if len(self.pending) >= self.thresholds.get('batch_size', 100) * 2:
-                    break
+    def collect(self, rel_path: str, path: str, blob_id: str):
+        """Add one staged blob to pending unless it is already collected."""
+        # Everything below parses the hex in the path; skip stray files
+        if not STAGED_BLOB_RE.fullmatch(rel_path):
+            return
+        # Every upload worker sees the whole tree; each takes only its own
+        # prefixes, so no two rsyncs send (and remove) the same blob
+        if not self.owns(rel_path):
+            return
+        # The first 64 bits of the blob_id identify it well enough and are
+        # far smaller than the path
+        key = int(blob_id[:16], 16)
+        if key in self.collected:
+            return
+        self.collected.add(key)
+        # Store the relative path (for rsync), full path, and blob_id (for the DB)
+        self.pending.append((rel_path, path, blob_id))
                     
+    def prewarm_ssh(self):
+        """Start (or reuse) the multiplexed ssh master connection."""
+        try:
+            subprocess.run(
+                ["ssh", *SSH_OPTIONS, UPLOAD_HOST, "true"],
+                capture_output=True, timeout=30
+            )
+        except Exception as e:
+            logger.warning(f"ssh prewarm failed: {e}")
+            
+    def watch_staging(self):
+        """Watch the staging tree with inotify (Linux only)."""
+        if INotify is None:
+            return
+        try:
+            self._inotify = INotify()
+            self.add_watch(STAGING_PATH)
+            for subdir in Path(STAGING_PATH).glob("*"):
+                if subdir.is_dir():
+                    self.add_watch(str(subdir))
+                    for leaf in subdir.glob("*"):
+                        if leaf.is_dir():
+                            self.add_watch(str(leaf))
+        except OSError as e:
+            self.stop_watching(f"inotify unavailable: {e}")
+            
+    def stop_watching(self, reason: str):
+        """Drop inotify and go back to rescanning the staging dir."""
+        logger.warning(f"UploadWorker {self.worker_id} polling staging dir ({reason})")
+        if self._inotify is not None:
+            self._inotify.close()
+        self._inotify = None
+        self._watch_dirs.clear()
+            
+    def add_watch(self, directory: str):
+        """Watch one staging directory for new subdirs and finished blobs."""
+        mask = inotify_flags.CREATE | inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+        wd = self._inotify.add_watch(directory, mask)
+        self._watch_dirs[wd] = directory
+        
+    def collect_events(self, timeout_ms: int):
+        """Collect blobs reported by inotify since the last call."""
+        # Watched dirs are all under STAGING_PATH/, so relative paths are
+        # plain slices of the full path
+        prefix_len = len(STAGING_PATH) + 1
+        for event in self._inotify.read(timeout=timeout_ms):
+            if event.mask & inotify_flags.Q_OVERFLOW:
+                # Events were lost; only a rescan can find those blobs
+                self.stop_watching("inotify queue overflowed")
+                return
+            directory = self._watch_dirs.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = f"{directory}/{event.name}"
+            
+            if event.mask & inotify_flags.ISDIR:
+                if event.mask & inotify_flags.CREATE:
+                    # New AA or AA/BB dir: watch it, then catch anything
+                    # written before the watch existed. Running out of
+                    # watches (ENOSPC, fs.inotify.max_user_watches) means
+                    # this dir would go unseen, so fall back to polling
+                    try:
+                        self.add_watch(path)
+                        children = list(Path(path).glob("**/*"))
+                        for child in children:
+                            if child.is_dir():
+                                self.add_watch(str(child))
+                    except OSError as e:
+                        self.stop_watching(f"cannot watch {path}: {e}")
+                        return
+                    for child in children:
+                        if child.is_file():
+                            child_path = str(child)
+                            self.collect(child_path[prefix_len:], child_path, child.name)
+                continue
+            
+            # Blobs live at AA/BB/blobid; only count them once fully written
+            if event.mask & (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO):
+                rel_path = path[prefix_len:]
+                if rel_path.count('/') == 2:
+                    self.collect(rel_path, path, event.name)
+                
     def upload_batch(self):
-        """Upload batch of blobs."""
+        """Upload batch of blobs, sharded across concurrent rsyncs."""
         if not self.pending:
             return
             
         start = time.time()
         
+        # Shard by AA prefix so each rsync works its own part of the tree
+        shards = {}
+        for entry in self.pending:
+            shards.setdefault(int(entry[0][:2], 16) % UPLOAD_SHARDS, []).append(entry)
+        shard_list = list(shards.values())
+        with ThreadPoolExecutor(max_workers=len(shard_list)) as executor:
+            results = list(executor.map(self.rsync_shard, range(len(shard_list)), shard_list))
+            
+        uploaded = [entry for shard, ok in zip(shard_list, results) if ok for entry in shard]
+        failed = []
+        for shard, ok in zip(shard_list, results):
+            if ok:
+                continue
+            for entry in shard:
+                # rsync only removes a source once it is sent, so a blob gone
+                # from staging made it up even though its shard failed
+                (failed if os.path.exists(entry[1]) else uploaded).append(entry)
+        
+        if uploaded:
+            elapsed = time.time() - start
+            self.total_uploaded += len(uploaded)
+            if self.staged_count is not None:
+                with self.staged_count.get_lock():
+                    self.staged_count.value = max(0, self.staged_count.value - len({blob_id for _, _, blob_id in uploaded}))
+            logger.info(
+                f"Uploaded batch: {len(uploaded)} files in {elapsed:.1f}s ({len(shard_list)} rsyncs)"
+            )
+            
+            # NOW mark files as uploaded in database
+            self.mark_files_uploaded(uploaded)
+            
+        # rsync removed the uploaded blobs from staging, so they can't be
+        # collected again
+        for _, _, blob_id in uploaded:
+            key = int(blob_id[:16], 16)
+            self.collected.discard(key)
+            self.failures.pop(key, None)
+            
+        # On error, remove from collected so the next scan retries them -
+        # up to UPLOAD_RETRIES times, so one bad blob can't fail its shard
+        # on every batch
+        for rel_path, _, blob_id in failed:
+            key = int(blob_id[:16], 16)
+            self.failures[key] = self.failures.get(key, 0) + 1
+            if self.failures[key] >= UPLOAD_RETRIES:
+                logger.error(f"Giving up on {rel_path} after {UPLOAD_RETRIES} failed uploads")
+            else:
+                self.collected.discard(key)
+        if failed:
+            self.rescan = True
+            
+        # Clear pending
+        self.pending.clear()
+        self.last_upload = time.time()
+        
+    def rsync_shard(self, shard: int, entries: list) -> bool:
+        """rsync one shard of the batch; True if it all went up."""
         # Create manifest for rsync (just the relative paths)
-        manifest_path = Path(f"/tmp/manifest_{self.worker_id}.txt")
-        rel_paths = [rel_path for rel_path, _ in self.pending]
-        manifest_path.write_text('\n'.join(rel_paths))
+        # Named by pid: a stopping worker may still be flushing while its
+        # replacement runs under the same worker_id
+        manifest_path = Path(f"/tmp/manifest_{os.getpid()}_{shard}.txt")
+        manifest_path.write_text('\n'.join(rel_path for rel_path, _, _ in entries))
         
-        # Batch rsync
         try:
             result = subprocess.run([
                 "rsync",
-                "-av",
+                *RSYNC_OPTIONS,
                 "--files-from", str(manifest_path),
-                "--relative",
-                "--remove-source-files",  # Delete after upload
-                "-e", f"ssh -p {SSH_PORT} -o BatchMode=yes -o ConnectTimeout=5 -o ServerAliveInterval=60",
                 STAGING_PATH,
                 f"{UPLOAD_HOST}:{UPLOAD_PATH}/"
             ], capture_output=True, text=True, timeout=300)
-            
-            if result.returncode == 0:
-                elapsed = time.time() - start
-                self.total_uploaded += len(self.pending)
-                logger.info(
-                    f"Uploaded batch: {len(self.pending)} files in {elapsed:.1f}s"
-                )
-                
-                # NOW mark files as uploaded in database
-                self.mark_files_uploaded()
-                
-            else:
+            if result.returncode != 0:
                 logger.error(f"Rsync failed: {result.stderr}")
-                # On error, remove from collected so we can retry
-                for _, full_path in self.pending:
-                    self.collected.discard(full_path)
-                
+            return result.returncode == 0
         except subprocess.TimeoutExpired:
             logger.error("Rsync timeout")
         except Exception as e:
             logger.error(f"Upload error: {e}")
-            
-        # Clear pending but keep collected set to avoid re-collecting
-        self.pending.clear()
-        self.last_upload = time.time()
-        manifest_path.unlink(missing_ok=True)
+        finally:
+            manifest_path.unlink(missing_ok=True)
+        return False
         
-    def mark_files_uploaded(self):
+    def mark_files_uploaded(self, entries: list):
         """Mark files as uploaded in database after successful rsync."""
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                for rel_path, full_path in self.pending:
-                    # Extract the original path from the staged blob path
-                    # Staged path format: /tmp/n2s_staging/AA/BB/blobid
-                    # We need to find the file with this blobid
-                    blob_id = Path(full_path).name
-                    
-                    # Update ALL files with this blobid as uploaded
-                    cur.execute("""
-                        UPDATE fs 
-                        SET uploaded = NOW()
-                        WHERE blobid = %s AND uploaded IS NULL
-                    """, (blob_id,))
-                    
+                # A batch can carry the same blob more than once; send each
+                # id once
+                blob_ids = list({blob_id for _, _, blob_id in entries})
+                
+                # Update ALL files with these blobids as uploaded, in one
+                # statement for the whole batch
+                execute_prepared(cur, 'mark_uploaded', (blob_ids,))
                 conn.commit()
                 
         except psycopg2.Error as e:
@@ -909,29 +1814,49 @@ class AutoTuningOrchestrator:
     def __init__(self):
         # Create queues
         global compress_queue, db_ops_queue
-        compress_queue = mp.Queue(maxsize=100)
+        compress_queue = mp.Queue(maxsize=COMPRESS_QUEUE_SIZE)
         self.compress_queue = compress_queue
         db_ops_queue = mp.Queue(maxsize=1000)  # For async DB operations
         self.db_ops_queue = db_ops_queue
         
+        # Pre-allocated shared memory segments for small files; workers
+        # pass segment names through shm_pool instead of creating their own
+        self.shm_segments = [
+            shared_memory.SharedMemory(create=True, size=SHM_SEGMENT_SIZE)
+            for _ in range(SHM_POOL_SIZE)
+        ]
+        self.shm_pool = mp.Queue()
+        for shm in self.shm_segments:
+            self.shm_pool.put(shm.name)
+        
+        # Blobs sitting in staging: compress workers add, upload workers
+        # subtract, so the tuner never has to walk the staging tree.
+        # Seeded once with whatever a previous run left behind
+        self.staged_count = mp.Value('q', sum(1 for _ in scan_staged()))
+        
         # Worker pools
         self.hash_workers = []
         self.compress_workers = []
         self.upload_workers = []
+        # Which upload worker (by slot) takes each AA staging prefix
+        self.upload_prefix_owners = mp.RawArray('b', 256)
+        self.upload_owners_version = mp.RawValue('i', 0)
+        # Running compress workers, which size their frame threads from it
+        self.compress_count = mp.RawValue('i', 0)
         self.db_worker = None  # Single DB worker for async operations
-        
-        # Create manager first
-        self.manager = mp.Manager()
+        self.monitor_conn = None  # Kept for print_stats' queue counts
+        self.queue_counts = (0, 0)  # (remaining, claimed) work_queue rows
+        self.queue_counts_due = 0.0
         
         # Shared worker stats
         self.hash_stats = []
         self.compress_stats = []
-        self.db_stats = self.manager.dict()  # Stats for DB worker
+        self.db_stats = WorkerStats()  # Stats for DB worker
         
         # Tunable thresholds
         # Initial thresholds - will be dynamically adjusted based on memory pressure
         available_ram = psutil.virtual_memory().available
-        self.thresholds = self.manager.dict({
+        self.thresholds = Thresholds({
             'shared_memory_max': 1_000_000_000,  # Start at 1GB! We have plenty of RAM
             'reread_threshold': 50_000_000,   # 50MB
             'batch_size': 100,
@@ -941,7 +1866,7 @@ class AutoTuningOrchestrator:
         
         # Create the global semaphore with initial value
         global disk_io_semaphore
-        disk_io_semaphore = mp.Semaphore(self.thresholds['disk_io_semaphores'])
+        disk_io_semaphore = ResizableSemaphore(self.thresholds['disk_io_semaphores'])
         logger.info(f"Initialized with shared_memory_max={humanize.naturalsize(self.thresholds['shared_memory_max'])}, disk_io_semaphores={self.thresholds['disk_io_semaphores']}")
         
         # Performance metrics
@@ -951,26 +1876,31 @@ class AutoTuningOrchestrator:
             'dedup_hits': 0,
             'last_tune': time.time(),
         }
+        # Elapsed seconds at which the next detailed dashboard is due
+        self.next_detailed_metrics = 30.0
         
         # System I/O tracking
         self.last_disk_io = psutil.disk_io_counters()
         self.last_net_io = psutil.net_io_counters()
         self.last_io_time = time.time()
+        psutil.cpu_percent(percpu=True)  # Baseline for non-blocking CPU sampling
+        self.sample_system()
         
         # Tuning parameters
         self.tune_interval = 30  # seconds
         self.aggressive_tune = True  # Start aggressive, learn over time
         
         # Throughput tracking for smarter tuning
-        self.throughput_history = []  # List of (timestamp, files/sec, config)
+        self.throughput_history = deque(maxlen=10)  # Last 10 (timestamp, files/sec, MB/s, config)
         self.last_tuning_action = None  # What we did last
         self.last_throughput_before_tuning = 0
         self.tuning_cooldown = 20  # Wait this long to measure impact (less than tune_interval!)
-        self.action_blacklist = {}  # Failed actions -> timestamp when blacklist expires
+        self.blacklist_until = np.zeros(len(TUNE_ACTIONS))  # Monotonic expiry per TUNE_ACTIONS kind
         
         # Create tuning log directory
         self.tuning_log_path = Path.home() / ".n2s" / "tuning.log"
         self.tuning_log_path.parent.mkdir(exist_ok=True)
+        self.tuning_log = open(self.tuning_log_path, "ab")  # Kept open for appends
         
         # Maintenance parameters
         self.maintenance_interval = 300  # 5 minutes
@@ -1006,6 +1936,7 @@ class AutoTuningOrchestrator:
         while not shutdown_flag.is_set():
             time.sleep(5)
             stats_counter += 5
+            self.sample_system()
             
             # Tune periodically
             if time.time() - self.metrics['last_tune'] > self.tune_interval:
@@ -1028,12 +1959,22 @@ class AutoTuningOrchestrator:
         # Shutdown
         self.shutdown()
         
+    def sample_system(self):
+        """Take this tick's psutil readings, shared by tune and the stats."""
+        self.sys_snapshot = {
+            'mem': psutil.virtual_memory(),
+            'disk_io': psutil.disk_io_counters(),
+            'net_io': psutil.net_io_counters(),
+            # Usage since the previous call, so no blocking interval
+            'cpu': psutil.cpu_percent(interval=None, percpu=True),
+        }
+        
     def spawn_hash_workers(self, count: int):
         """Spawn hash workers."""
         for i in range(count):
             worker_id = f"hash_{len(self.hash_workers)}"
-            stats = self.manager.dict()  # Create shared dict for this worker
-            worker = HashWorker(worker_id, self.compress_queue, self.thresholds, stats)
+            stats = WorkerStats()  # Shared-memory stats for this worker
+            worker = HashWorker(worker_id, self.compress_queue, self.thresholds, stats, self.shm_pool)
             worker.start()
             self.hash_workers.append(worker)
             self.hash_stats.append(stats)
@@ -1045,11 +1986,13 @@ class AutoTuningOrchestrator:
         """Spawn compress workers."""
         for i in range(count):
             worker_id = f"compress_{len(self.compress_workers)}"
-            stats = self.manager.dict()  # Create shared dict for this worker
-            worker = CompressWorker(worker_id, self.compress_queue, stats)
+            stats = WorkerStats()  # Shared-memory stats for this worker
+            worker = CompressWorker(worker_id, self.compress_queue, stats, self.shm_pool,
+                                    self.staged_count, self.compress_count)
             worker.start()
             self.compress_workers.append(worker)
             self.compress_stats.append(stats)
+        self.compress_count.value = len(self.compress_workers)
             
         # Don't log spawns during tuning, the tune() method will log it
         pass
@@ -1057,10 +2000,14 @@ class AutoTuningOrchestrator:
     def spawn_upload_workers(self, count: int):
         """Spawn upload workers."""
         for i in range(count):
-            worker_id = f"upload_{len(self.upload_workers)}"
-            worker = UploadWorker(worker_id, self.thresholds)
+            slot = min(set(range(MAX_UPLOAD)) - {worker.slot for worker in self.upload_workers})
+            worker = UploadWorker(
+                f"upload_{slot}", self.thresholds, self.staged_count,
+                slot, self.upload_prefix_owners, self.upload_owners_version
+            )
             worker.start()
             self.upload_workers.append(worker)
+        self.assign_upload_prefixes()
             
         # Don't log spawns during tuning, the tune() method will log it
         pass
@@ -1070,8 +2017,9 @@ class AutoTuningOrchestrator:
         
         # Calculate current throughput metrics
         elapsed = time.time() - self.metrics['start_time']
-        total_processed = sum(s.get('files_processed', 0) for s in self.hash_stats)
-        total_bytes = sum(s.get('bytes_hashed', 0) for s in self.hash_stats)
+        hash_totals = WorkerStats.totals(self.hash_stats)
+        total_processed = hash_totals['files_processed']
+        total_bytes = hash_totals['bytes_hashed']
         current_files_per_sec = total_processed / max(1, elapsed)
         current_mb_per_sec = total_bytes / max(1, elapsed) / 1_000_000
         
@@ -1086,10 +2034,6 @@ class AutoTuningOrchestrator:
             current_config
         ))
         
-        # Keep only last 10 measurements
-        if len(self.throughput_history) > 10:
-            self.throughput_history.pop(0)
-        
         # Check if we're in cooldown period after last tuning
         if self.last_tuning_action and (time.time() - self.last_tuning_action['time']) < self.tuning_cooldown:
             remaining = self.tuning_cooldown - (time.time() - self.last_tuning_action['time'])
@@ -1100,18 +2044,19 @@ class AutoTuningOrchestrator:
         throughput_trend = "stable"
         if len(self.throughput_history) >= 3:
             # Check MB/s trend (more important than file count)
-            recent_mb_per_sec = [h[2] for h in self.throughput_history[-3:]]
-            recent_files_per_sec = [h[1] for h in self.throughput_history[-3:]]
+            # Only the ends of the last three samples matter
+            _, head_files, head_mb, _ = self.throughput_history[-3]
+            _, tail_files, tail_mb, _ = self.throughput_history[-1]
             
             # MB/s is primary metric
-            if recent_mb_per_sec[-1] > recent_mb_per_sec[0] * 1.1:
+            if tail_mb > head_mb * 1.1:
                 throughput_trend = "improving"
-            elif recent_mb_per_sec[-1] < recent_mb_per_sec[0] * 0.9:
+            elif tail_mb < head_mb * 0.9:
                 throughput_trend = "declining"
             # If MB/s stable, check files/sec
-            elif recent_files_per_sec[-1] > recent_files_per_sec[0] * 1.1:
+            elif tail_files > head_files * 1.1:
                 throughput_trend = "improving"
-            elif recent_files_per_sec[-1] < recent_files_per_sec[0] * 0.9:
+            elif tail_files < head_files * 0.9:
                 throughput_trend = "declining"
         
         # Check if last tuning action actually helped or hurt (after cooldown period)
@@ -1128,8 +2073,8 @@ class AutoTuningOrchestrator:
                     logger.info(f"🔴 Last tuning made things worse (was {self.last_throughput_before_tuning:.1f} f/s, now {current_files_per_sec:.1f} f/s | {current_mb_per_sec:.1f} MB/s)")
                     
                     # Blacklist the failed action for 5 minutes
-                    failed_action = self.last_tuning_action['action'].split('+')[0] if '+' in self.last_tuning_action['action'] else self.last_tuning_action['action'].split('→')[0]
-                    self.action_blacklist[failed_action] = time.time() + 300  # 5 minute blacklist
+                    failed_action = re.match(r'[A-Za-z]+', self.last_tuning_action['action']).group()
+                    self.blacklist_until[TUNE_ACTIONS.index(failed_action)] = time.monotonic() + BLACKLIST_SECONDS
                     logger.info(f"Blacklisting {failed_action} actions for 5 minutes")
                     
                     # Revert or try opposite
@@ -1167,7 +2112,7 @@ class AutoTuningOrchestrator:
             compress_idle_pct = self.get_compress_idle_percentage()
             
             # Experimental probing - try different things
-            staged_files = len(list(Path(STAGING_PATH).glob("*/*/*")))
+            staged_files = self.staged_count.value
             worker_ratio = len(self.compress_workers) / max(1, len(self.hash_workers))
             
             # PRIORITIZE ACTUAL BOTTLENECKS FIRST
@@ -1203,8 +2148,8 @@ class AutoTuningOrchestrator:
                     
             # 4. Check for disk I/O issues
             if len(self.hash_workers) > 2:
-                is_thrashing, thrash_ratio = self.detect_disk_thrashing()
-                if is_thrashing and thrash_ratio > 10 and self.thresholds['disk_io_semaphores'] > 1:
+                is_thrashing, is_severe = self.detect_disk_thrashing()
+                if is_severe and self.thresholds['disk_io_semaphores'] > 1:
                     # Severe thrashing - reduce semaphores
                     self.adjust_disk_semaphores(-1)
                     self.record_tuning_action(f"Semaphores-1→{self.thresholds['disk_io_semaphores']} (thrashing)", current_files_per_sec, current_mb_per_sec)
@@ -1216,25 +2161,37 @@ class AutoTuningOrchestrator:
                     return
                     
             # 5. ONLY NOW check memory adjustments - and make them evidence-based
-            mem = psutil.virtual_memory()
-            total_files_processed = sum(s.get('files_processed', 0) for s in self.hash_stats)
-            total_files_reread = sum(s.get('files_reread', 0) for s in self.hash_stats)
-            total_files_in_memory = sum(s.get('files_in_memory', 0) for s in self.hash_stats)
+            mem = self.sys_snapshot['mem']
+            memory_action = self.get_memory_pressure_action()
+            total_files_processed = hash_totals['files_processed']
+            total_files_reread = hash_totals['files_reread']
+            total_files_in_memory = hash_totals['files_in_memory']
             
             # Calculate reread ratio
             reread_ratio = total_files_reread / max(1, total_files_processed)
             memory_ratio = total_files_in_memory / max(1, total_files_processed)
             
-            # Only adjust memory if we have evidence it's needed
-            if mem.percent > 85 and self.thresholds['shared_memory_max'] > 100_000_000:
+            # Only adjust memory if we have evidence it's needed. Pressure
+            # counts both the system and our own workers' PSS
+            if memory_action in ('decrease', 'decrease_urgent') and self.thresholds['shared_memory_max'] > 100_000_000:
                 # Memory pressure HIGH - must reduce
                 old_max = self.thresholds['shared_memory_max']
-                new_max = max(100_000_000, int(old_max * 0.5))
+                factor = 0.25 if memory_action == 'decrease_urgent' else 0.5
+                new_max = max(100_000_000, int(old_max * factor))
                 self.thresholds['shared_memory_max'] = new_max
                 logger.info(f"🎯 TUNING: Memory threshold {humanize.naturalsize(old_max)} → {humanize.naturalsize(new_max)} (mem: {mem.percent:.0f}% HIGH!)")
                 self.record_tuning_action(f"MemMax→{humanize.naturalsize(new_max)} (pressure)", current_files_per_sec, current_mb_per_sec)
                 return
-            elif reread_ratio > 0.3 and mem.percent < 70 and self.thresholds['shared_memory_max'] < 2_000_000_000:
+            elif memory_action in ('increase_aggressive', 'increase_moderate') and self.thresholds['shared_memory_max'] < 2_000_000_000:
+                # Files are hitting the limit with memory to spare
+                old_max = self.thresholds['shared_memory_max']
+                factor = 2.0 if memory_action == 'increase_aggressive' else 1.5
+                new_max = min(2_000_000_000, int(old_max * factor))
+                self.thresholds['shared_memory_max'] = new_max
+                logger.info(f"🎯 TUNING: Memory threshold {humanize.naturalsize(old_max)} → {humanize.naturalsize(new_max)} (shm near limit)")
+                self.record_tuning_action(f"MemMax→{humanize.naturalsize(new_max)} (headroom)", current_files_per_sec, current_mb_per_sec)
+                return
+            elif reread_ratio > 0.3 and memory_action is None and mem.percent < 70 and self.thresholds['shared_memory_max'] < 2_000_000_000:
                 # Many rereads happening AND we have memory available - increase threshold
                 old_max = self.thresholds['shared_memory_max']
                 new_max = min(2_000_000_000, int(old_max * 1.5))
@@ -1276,28 +2233,23 @@ class AutoTuningOrchestrator:
             }
         }
         try:
-            with open(self.tuning_log_path, "a") as f:
-                f.write(json.dumps(log_entry) + "\n")
+            self.tuning_log.write(orjson.dumps(log_entry) + b"\n")
+            self.tuning_log.flush()  # One write per action; survives a hard kill
         except Exception as e:
             logger.warning(f"Failed to write tuning log: {e}")
     
     def is_blacklisted(self, action_type: str) -> bool:
         """Check if an action type is currently blacklisted."""
-        if action_type in self.action_blacklist:
-            if time.time() < self.action_blacklist[action_type]:
-                return True
-            else:
-                # Expired, remove from blacklist
-                del self.action_blacklist[action_type]
-        return False
+        return time.monotonic() < self.blacklist_until[TUNE_ACTIONS.index(action_type)]
     
     def get_compress_idle_percentage(self) -> float:
         """Calculate percentage of time compress workers are idle."""
         if not self.compress_stats:
             return 0
         
-        total_wait = sum(s.get('wait_time_ms', 0) for s in self.compress_stats)
-        total_work = sum(s.get('work_time_ms', 0) for s in self.compress_stats)
+        totals = WorkerStats.totals(self.compress_stats)
+        total_wait = totals['wait_time_ms']
+        total_work = totals['work_time_ms']
         total_time = total_wait + total_work
         
         if total_time > 0:
@@ -1306,31 +2258,48 @@ class AutoTuningOrchestrator:
     
     def adjust_disk_semaphores(self, delta: int):
         """Adjust the number of disk I/O semaphores."""
-        global disk_io_semaphore
-        
         old_count = self.thresholds['disk_io_semaphores']
         new_count = max(1, min(8, old_count + delta))  # Between 1 and 8
         
         if new_count != old_count:
             self.thresholds['disk_io_semaphores'] = new_count
-            # Note: We can't actually change the semaphore count at runtime
-            # Workers will need to restart to use the new value
-            # For now, just log the change
+            # Running workers share this semaphore, so this applies at once
+            disk_io_semaphore.set_limit(new_count)
             logger.info(f"Disk I/O semaphores: {old_count} → {new_count}")
-            # TODO: Implement worker restart to apply new semaphore count
     
-    def detect_disk_thrashing(self) -> tuple[bool, float]:
-        """Detect if disk is thrashing based on read latencies."""
-        global disk_read_latencies
-        
-        if len(disk_read_latencies) < 20:
-            return False, 0.0
-        
-        # Calculate p50 and p95
-        import numpy as np
-        sorted_latencies = sorted(disk_read_latencies)
-        p50 = np.percentile(sorted_latencies, 50)
-        p95 = np.percentile(sorted_latencies, 95)
+    def read_io_pressure(self) -> Optional[float]:
+        """Return the 'some avg10' I/O stall percentage, or None without PSI."""
+        try:
+            for line in PSI_IO_PATH.read_text().splitlines():
+                if line.startswith("some "):
+                    return float(line.split()[1].split("=")[1])
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+    
+    def detect_disk_thrashing(self) -> tuple[bool, bool]:
+        """Detect if disk is thrashing; returns (thrashing, severe).
+        
+        Uses the kernel's I/O pressure stall figure where available (Linux),
+        otherwise the spread of sampled read latencies.
+        """
+        pressure = self.read_io_pressure()
+        if pressure is not None:
+            if pressure > PSI_IO_SEVERE:
+                logger.warning(f"Disk thrashing detected! I/O stalled {pressure:.1f}% of the last 10s")
+                return True, True
+            elif pressure > PSI_IO_HIGH:
+                logger.info(f"Disk I/O pressure high: stalled {pressure:.1f}% of the last 10s")
+                return True, False
+            return False, False
+        
+        # Each hash worker keeps its own window; pool them
+        samples = [worker.read_latencies.values() for worker in self.hash_workers]
+        if sum(len(s) for s in samples) < 20:
+            return False, False
+        
+        # Calculate p50 and p95 in one pass
+        p50, p95 = np.percentile(np.concatenate(samples), [50, 95])
         
         # High ratio means high variability = likely thrashing
         if p50 > 0:
@@ -1339,30 +2308,42 @@ class AutoTuningOrchestrator:
             # Log if concerning
             if thrashing_ratio > 10:
                 logger.warning(f"Disk thrashing detected! P50: {p50:.1f}ms, P95: {p95:.1f}ms, ratio: {thrashing_ratio:.1f}")
-                return True, thrashing_ratio
+                return True, True
             elif thrashing_ratio > 5:
                 logger.info(f"Disk latency variability high. P50: {p50:.1f}ms, P95: {p95:.1f}ms, ratio: {thrashing_ratio:.1f}")
-                return True, thrashing_ratio
+                return True, False
         
-        return False, thrashing_ratio if p50 > 0 else 0.0
+        return False, False
+    
+    def process_family_memory(self) -> int:
+        """Bytes of memory used by this process and all its workers.
+        
+        Uses PSS where the OS reports it (Linux), so pages shared between
+        workers - shared memory segments above all - are counted once
+        rather than once per process. Falls back to current RSS.
+        """
+        me = psutil.Process()
+        total = 0
+        for proc in [me, *me.children(recursive=True)]:
+            try:
+                if sys.platform == 'linux':
+                    total += proc.memory_full_info().pss
+                else:
+                    total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
     
     def get_memory_pressure_action(self) -> Optional[str]:
         """Determine if memory adjustments are needed based on pressure."""
-        mem = psutil.virtual_memory()
+        mem = self.sys_snapshot['mem']
         current_max = self.thresholds['shared_memory_max']
         
         # Get process-specific memory usage
-        usage = resource.getrusage(resource.RUSAGE_CHILDREN)  # All child processes
-        self_usage = resource.getrusage(resource.RUSAGE_SELF)  # This process
-        
-        # On macOS ru_maxrss is in bytes, on Linux it's in KB
-        if sys.platform == 'darwin':
-            process_rss_mb = (usage.ru_maxrss + self_usage.ru_maxrss) / 1024 / 1024
-        else:
-            process_rss_mb = (usage.ru_maxrss + self_usage.ru_maxrss) / 1024
+        process_rss_mb = self.process_family_memory() / 1024 / 1024
         
         # Track shared memory actually in use
-        shm_in_use = sum(s.get('shm_metrics', {}).get('total_bytes', 0) for s in self.hash_stats)
+        shm_in_use = WorkerStats.totals(self.hash_stats)['shm_total_bytes']
         
         # Calculate our process family's impact on system
         our_memory_pct = (process_rss_mb * 1024 * 1024) / mem.total * 100
@@ -1377,12 +2358,12 @@ class AutoTuningOrchestrator:
             # Low pressure - can increase if needed
             if current_max < 1_500_000_000 and shm_in_use > current_max * 0.9:
                 return "increase_moderate"
-        elif mem.percent > 85 or our_memory_pct > 40:
-            # High pressure or we're using too much
-            return "decrease"
         elif mem.percent > 90 or our_memory_pct > 50:
             # Critical - decrease immediately
             return "decrease_urgent"
+        elif mem.percent > 85 or our_memory_pct > 40:
+            # High pressure or we're using too much
+            return "decrease"
         
         return None
                                                        
@@ -1399,12 +2380,23 @@ class AutoTuningOrchestrator:
             worker = self.compress_workers.pop(0)
             self.compress_stats.pop(0)
             worker.stop_flag.set()
+            self.compress_count.value = len(self.compress_workers)
             
     def remove_upload_worker(self):
         """Remove an upload worker."""
         if self.upload_workers:
             worker = self.upload_workers.pop(0)
             worker.stop_flag.set()
+            self.assign_upload_prefixes()
+            
+    def assign_upload_prefixes(self):
+        """Split the AA staging prefixes into a contiguous range per upload worker."""
+        # Contiguous ranges, so each worker's batch still spreads over all
+        # UPLOAD_SHARDS (shards are prefix % UPLOAD_SHARDS)
+        slots = sorted(worker.slot for worker in self.upload_workers)
+        for prefix in range(256):
+            self.upload_prefix_owners[prefix] = slots[prefix * len(slots) // 256] if slots else -1
+        self.upload_owners_version.value += 1
             
     def run_maintenance(self):
         """Run periodic maintenance tasks."""
@@ -1414,29 +2406,14 @@ class AutoTuningOrchestrator:
         try:
             with conn.cursor() as cur:
                 # Reset stale claims
-                cur.execute("""
-                    UPDATE work_queue 
-                    SET claimed_at = NULL, claimed_by = NULL
-                    WHERE claimed_at < NOW() - INTERVAL '%s minutes'
-                    RETURNING pth
-                """, (self.stale_claim_minutes,))
+                execute_prepared(cur, 'reset_stale_claims', (self.stale_claim_minutes,))
                 
                 reset_count = cur.rowcount
                 if reset_count > 0:
                     logger.info(f"  Reset {reset_count} stale claims")
                 
                 # Remove completed files from queue
-                cur.execute("""
-                    DELETE FROM work_queue
-                    WHERE pth IN (
-                        SELECT wq.pth
-                        FROM work_queue wq
-                        JOIN fs ON fs.pth = wq.pth
-                        WHERE fs.blobid IS NOT NULL
-                           OR fs.last_missing_at IS NOT NULL
-                           OR fs.cantfind = true
-                    )
-                """)
+                execute_prepared(cur, 'remove_completed')
                 
                 removed_count = cur.rowcount
                 if removed_count > 0:
@@ -1469,12 +2446,12 @@ class AutoTuningOrchestrator:
         time_delta = current_time - self.last_io_time
         
         # Disk I/O
-        disk_io = psutil.disk_io_counters()
+        disk_io = self.sys_snapshot['disk_io']
         disk_read_mbps = (disk_io.read_bytes - self.last_disk_io.read_bytes) / time_delta / 1_000_000
         disk_write_mbps = (disk_io.write_bytes - self.last_disk_io.write_bytes) / time_delta / 1_000_000
         
         # Network I/O
-        net_io = psutil.net_io_counters()
+        net_io = self.sys_snapshot['net_io']
         net_upload_mbps = (net_io.bytes_sent - self.last_net_io.bytes_sent) / time_delta / 1_000_000
         
         # Update last values
@@ -1483,18 +2460,15 @@ class AutoTuningOrchestrator:
         self.last_io_time = current_time
         
         # CPU per core
-        cpu_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
+        cpu_per_core = self.sys_snapshot['cpu']
         
         # Memory details
-        mem = psutil.virtual_memory()
+        mem = self.sys_snapshot['mem']
         
         # Shared memory tracking
-        shm_bytes = 0
-        shm_segments = 0
-        for stats in self.hash_stats:
-            if 'shm_metrics' in stats:
-                shm_bytes += stats['shm_metrics'].get('total_bytes', 0)
-                shm_segments += stats['shm_metrics'].get('active_segments', 0)
+        hash_totals = WorkerStats.totals(self.hash_stats)
+        shm_bytes = hash_totals['shm_total_bytes']
+        shm_segments = hash_totals['shm_active_segments']
         
         # Process memory
         process = psutil.Process()
@@ -1520,11 +2494,12 @@ class AutoTuningOrchestrator:
         """Calculate worker efficiency metrics."""
         if not worker_stats:
             return {}
+        totals = WorkerStats.totals(worker_stats)
             
         if worker_type == 'hash':
-            total_read = sum(s.get('read_time_ms', 0) for s in worker_stats)
-            total_hash = sum(s.get('hash_time_ms', 0) for s in worker_stats)
-            total_dedup = sum(s.get('dedup_time_ms', 0) for s in worker_stats)
+            total_read = totals['read_time_ms']
+            total_hash = totals['hash_time_ms']
+            total_dedup = totals['dedup_time_ms']
             total_time = total_read + total_hash + total_dedup
             
             if total_time > 0:
@@ -1532,35 +2507,30 @@ class AutoTuningOrchestrator:
                     'read_pct': (total_read / total_time) * 100,
                     'hash_pct': (total_hash / total_time) * 100,
                     'dedup_pct': (total_dedup / total_time) * 100,
-                    'bytes_per_sec': sum(s.get('bytes_read', 0) for s in worker_stats) / max(1, total_time/1000)
+                    'bytes_per_sec': totals['bytes_read'] / max(1, total_time/1000)
                 }
         
         elif worker_type == 'compress':
-            total_wait = sum(s.get('wait_time_ms', 0) for s in worker_stats)
-            total_work = sum(s.get('work_time_ms', 0) for s in worker_stats)
+            total_wait = totals['wait_time_ms']
+            total_work = totals['work_time_ms']
             total_time = total_wait + total_work
             
             if total_time > 0:
                 return {
                     'idle_pct': (total_wait / total_time) * 100,
                     'work_pct': (total_work / total_time) * 100,
-                    'items': sum(s.get('items_processed', 0) for s in worker_stats)
+                    'items': totals['items_processed']
                 }
         
         return {}
     
     def calculate_db_stats(self) -> dict:
         """Calculate database latency statistics."""
-        import numpy as np
-        
         stats = {}
         for query_type in ['claim', 'dedup']:
-            if db_latencies[query_type]:
-                stats[query_type] = {
-                    'p50': np.percentile(db_latencies[query_type], 50),
-                    'p95': np.percentile(db_latencies[query_type], 95),
-                    'p99': np.percentile(db_latencies[query_type], 99)
-                }
+            if len(db_latencies[query_type]):
+                p50, p95, p99 = np.percentile(db_latencies[query_type].values(), [50, 95, 99])
+                stats[query_type] = {'p50': p50, 'p95': p95, 'p99': p99}
         return stats
     
     def print_detailed_metrics(self, hash_eff: dict, compress_eff: dict, sys_metrics: dict, db_stats: dict):
@@ -1629,7 +2599,7 @@ class AutoTuningOrchestrator:
             return "Database is slow - optimize queries"
         elif sys_metrics['cpu_max_core'] > 90:
             return "CPU bound - at capacity"
-        elif sys_metrics['net_upload_mbps'] < 1 and len(list(Path(STAGING_PATH).glob("*/*/*"))) > 50:
+        elif sys_metrics['net_upload_mbps'] < 1 and self.staged_count.value > 50:
             return "Network upload is slow"
         elif sys_metrics.get('mem_percent', 0) > 80:
             return "Memory pressure high - monitor closely"
@@ -1640,11 +2610,12 @@ class AutoTuningOrchestrator:
         """Print current statistics with detailed metrics."""
         elapsed = time.time() - self.metrics['start_time']
         
-        # Collect worker stats from shared dicts
-        total_processed = sum(s.get('files_processed', 0) for s in self.hash_stats)
-        total_dedup = sum(s.get('dedup_hits', 0) for s in self.hash_stats)
-        total_compressed = sum(s.get('files_compressed', 0) for s in self.compress_stats)
-        total_bytes = sum(s.get('bytes_hashed', 0) for s in self.hash_stats)
+        # Collect worker stats from shared memory
+        hash_totals = WorkerStats.totals(self.hash_stats)
+        total_processed = hash_totals['files_processed']
+        total_dedup = hash_totals['dedup_hits']
+        total_compressed = WorkerStats.totals(self.compress_stats)['files_compressed']
+        total_bytes = hash_totals['bytes_hashed']
         
         # Get queue sizes
         try:
@@ -1653,22 +2624,24 @@ class AutoTuningOrchestrator:
             compress_queue_size = -1  # Use -1 as sentinel for macOS
             
         # Count staged files
-        staged_files = len(list(Path(STAGING_PATH).glob("*/*/*")))
+        staged_files = self.staged_count.value
         
-        # Get remaining work from database
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM work_queue WHERE claimed_at IS NULL")
-                remaining_work = cur.fetchone()[0]
-                
-                cur.execute("SELECT COUNT(*) FROM work_queue WHERE claimed_at IS NOT NULL")
-                claimed_work = cur.fetchone()[0]
-        except:
-            remaining_work = 0
-            claimed_work = 0
-        finally:
-            return_db_connection(conn)
+        # Get remaining and claimed work from database in one scan, at
+        # most every QUEUE_COUNT_SECONDS
+        now = time.monotonic()
+        if now >= self.queue_counts_due:
+            try:
+                with self.monitor_connection().cursor() as cur:
+                    cur.execute("""
+                        SELECT COUNT(*) FILTER (WHERE claimed_at IS NULL),
+                               COUNT(*) FILTER (WHERE claimed_at IS NOT NULL)
+                        FROM work_queue
+                    """)
+                    self.queue_counts = cur.fetchone()
+            except psycopg2.Error:
+                self.queue_counts = (0, 0)
+            self.queue_counts_due = now + QUEUE_COUNT_SECONDS
+        remaining_work, claimed_work = self.queue_counts
             
         # Calculate rates
         if elapsed > 0:
@@ -1690,9 +2663,9 @@ class AutoTuningOrchestrator:
         queue_indicator = ""
         if compress_queue_size == -1:  # macOS
             queue_indicator = "[?]"
-        elif compress_queue_size > 80:
+        elif compress_queue_size > COMPRESS_QUEUE_SIZE * 0.8:
             queue_indicator = "[HIGH]"
-        elif compress_queue_size > 50:
+        elif compress_queue_size > COMPRESS_QUEUE_SIZE * 0.5:
             queue_indicator = "[MED]"
         else:
             queue_indicator = "[LOW]"
@@ -1706,8 +2679,9 @@ class AutoTuningOrchestrator:
             stage_indicator = "[OK]"
             
         # Calculate contention indicators
-        cpu_pct = psutil.cpu_percent(interval=0.1)
-        mem_pct = psutil.virtual_memory().percent
+        cpu_per_core = self.sys_snapshot['cpu']
+        cpu_pct = sum(cpu_per_core) / max(1, len(cpu_per_core))
+        mem_pct = self.sys_snapshot['mem'].percent
         
         # Contention/pressure indicators - adjusted for macOS
         bottleneck = ""
@@ -1719,7 +2693,7 @@ class AutoTuningOrchestrator:
                 bottleneck = "[U-SLOW]"
             else:
                 bottleneck = "[OK]"
-        elif compress_queue_size > 70:
+        elif compress_queue_size > COMPRESS_QUEUE_SIZE * 0.7:
             bottleneck = "[C-SLOW]"
         elif staged_files > 500:
             bottleneck = "[U-SLOW]"
@@ -1732,16 +2706,6 @@ class AutoTuningOrchestrator:
         else:
             bottleneck = "[OK]"
             
-        # Collect detailed metrics
-        sys_metrics = self.collect_system_metrics()
-        
-        # Calculate worker efficiency
-        hash_efficiency = self.calculate_worker_efficiency(self.hash_stats, 'hash')
-        compress_efficiency = self.calculate_worker_efficiency(self.compress_stats, 'compress')
-        
-        # Database latency percentiles
-        db_stats = self.calculate_db_stats()
-        
         # Print compact stats
         if elapsed > 0:
             logger.info(
@@ -1751,40 +2715,52 @@ class AutoTuningOrchestrator:
                 f"{bottleneck:>9}"
             )
             
-            # Every 30 seconds, show detailed metrics
-            if int(elapsed) % 30 == 0 and elapsed > 0:
+            # Every 30 seconds, show detailed metrics. Stats ticks are ~5s
+            # apart and drift, so compare against a schedule rather than
+            # hoping a tick lands on a multiple of 30
+            if elapsed >= self.next_detailed_metrics:
+                # Only the dashboard uses these. The I/O rates are averaged
+                # over the time since the previous dashboard
+                sys_metrics = self.collect_system_metrics()
+                hash_efficiency = self.calculate_worker_efficiency(self.hash_stats, 'hash')
+                compress_efficiency = self.calculate_worker_efficiency(self.compress_stats, 'compress')
+                db_stats = self.calculate_db_stats()
                 self.print_detailed_metrics(hash_efficiency, compress_efficiency, sys_metrics, db_stats)
-        
-    def emergency_upload(self, remaining_files: list):
+                while self.next_detailed_metrics <= elapsed:
+                    self.next_detailed_metrics += 30.0
+        
+    def monitor_connection(self):
+        """Return the orchestrator's long-lived stats connection, reopening it if lost."""
+        if self.monitor_conn is None or self.monitor_conn.closed:
+            if self.monitor_conn is not None:
+                connection_pool.putconn(self.monitor_conn, close=True)
+            self.monitor_conn = get_db_connection()
+            # Autocommit so the counts don't hold a snapshot open between ticks
+            self.monitor_conn.autocommit = True
+        return self.monitor_conn
+        
+    def emergency_upload(self, remaining_files: List[str]):
         """Upload any files that didn't get uploaded during normal shutdown."""
         if not remaining_files:
             return
             
-        staging_path = Path(STAGING_PATH)
-        
-        # Extract blob IDs from filenames (files are named with their blob_id)
-        # The files themselves are JSON blobs with LZ4-compressed content, 
-        # but we don't need to read them - just extract the blob_id from filename
-        blob_ids = []
-        for file_path in remaining_files:
-            # Staged path format: /tmp/n2s_staging/AA/BB/blobid
-            blob_id = file_path.name
-            blob_ids.append(blob_id)
+        # Extract blob IDs from filenames (files are named with their blob_id),
+        # so the blobs themselves never need to be read
+        # Staged path format: /tmp/n2s_staging/AA/BB/blobid
+        blob_ids = [os.path.basename(file_path) for file_path in remaining_files]
         
-        # Create manifest for rsync
+        # Create manifest for rsync; every path starts with STAGING_PATH/
         manifest_path = Path("/tmp/emergency_manifest.txt")
-        rel_paths = [str(f.relative_to(staging_path)) for f in remaining_files]
-        manifest_path.write_text('\n'.join(rel_paths))
+        prefix_len = len(STAGING_PATH) + 1
+        with open(manifest_path, 'w') as manifest:
+            manifest.writelines(f"{file_path[prefix_len:]}\n" for file_path in remaining_files)
         
         # Batch rsync
         try:
             result = subprocess.run([
                 "rsync",
-                "-av",
+                *RSYNC_OPTIONS,
                 "--files-from", str(manifest_path),
-                "--relative",
-                "--remove-source-files",  # Delete after upload
-                "-e", f"ssh -p {SSH_PORT} -o BatchMode=yes -o ConnectTimeout=5 -o ServerAliveInterval=60",
                 STAGING_PATH,
                 f"{UPLOAD_HOST}:{UPLOAD_PATH}/"
             ], capture_output=True, text=True, timeout=60)
@@ -1796,13 +2772,9 @@ class AutoTuningOrchestrator:
                 conn = get_db_connection()
                 try:
                     with conn.cursor() as cur:
-                        for blob_id in blob_ids:
-                            # Update ALL files with this blob_id as uploaded
-                            cur.execute("""
-                                UPDATE fs 
-                                SET uploaded = NOW()
-                                WHERE blobid = %s AND uploaded IS NULL
-                            """, (blob_id,))
+                        # Update ALL files with these blob_ids as uploaded,
+                        # in one statement
+                        execute_prepared(cur, 'mark_uploaded', (blob_ids,))
                         conn.commit()
                         logger.info(f"Updated database for {len(blob_ids)} blob uploads")
                 except Exception as e:
@@ -1819,16 +2791,35 @@ class AutoTuningOrchestrator:
             if manifest_path.exists():
                 manifest_path.unlink()
     
+    def join_workers(self, workers: list, timeout: float):
+        """Wait for workers together, up to timeout in all, then terminate stragglers."""
+        deadline = time.monotonic() + timeout
+        alive = [worker for worker in workers if worker.is_alive()]
+        while alive:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Wakes as soon as any of them exits
+            wait_for_any([worker.sentinel for worker in alive], timeout=remaining)
+            alive = [worker for worker in alive if worker.is_alive()]
+            
+        for worker in alive:
+            logger.warning(f"Force terminating {worker.worker_id}")
+            worker.terminate()
+        for worker in alive:
+            worker.join(timeout=2)
+    
     def shutdown(self):
         logger.info("\n" + "="*60)
         logger.info("Initiating graceful shutdown...")
         logger.info("="*60)
         
-        # Collect final stats before shutdown from shared dicts
-        total_processed = sum(s.get('files_processed', 0) for s in self.hash_stats)
-        total_dedup = sum(s.get('dedup_hits', 0) for s in self.hash_stats)
-        total_compressed = sum(s.get('files_compressed', 0) for s in self.compress_stats)
-        total_bytes = sum(s.get('bytes_hashed', 0) for s in self.hash_stats)
+        # Collect final stats before shutdown from shared memory
+        hash_totals = WorkerStats.totals(self.hash_stats)
+        total_processed = hash_totals['files_processed']
+        total_dedup = hash_totals['dedup_hits']
+        total_compressed = WorkerStats.totals(self.compress_stats)['files_compressed']
+        total_bytes = hash_totals['bytes_hashed']
         
         # Stop hash workers first (stop claiming new work)
         logger.info("Stopping hash workers...")
@@ -1857,33 +2848,19 @@ class AutoTuningOrchestrator:
         logger.info("Waiting for workers to complete...")
         
         # Wait for hash and compress workers first
-        for worker in self.hash_workers + self.compress_workers:
-            worker.join(timeout=10)
-            if worker.is_alive():
-                logger.warning(f"Force terminating {worker.worker_id}")
-                worker.terminate()
-                worker.join(timeout=2)
+        self.join_workers(self.hash_workers + self.compress_workers, timeout=10)
                 
         # Wait for DB worker
         if self.db_worker:
-            self.db_worker.join(timeout=10)
-            if self.db_worker.is_alive():
-                logger.warning("Force terminating DB worker")
-                self.db_worker.terminate()
-                self.db_worker.join(timeout=2)
+            self.join_workers([self.db_worker], timeout=10)
         
         # Give upload workers more time to finish
         logger.info("Waiting for upload workers to finish...")
-        for worker in self.upload_workers:
-            worker.join(timeout=30)  # More time for uploads
-            if worker.is_alive():
-                logger.warning(f"Force terminating {worker.worker_id}")
-                worker.terminate()
-                worker.join(timeout=2)
+        self.join_workers(self.upload_workers, timeout=30)  # More time for uploads
             
         # Check for any remaining staged files and upload them
         logger.info("Checking for remaining staged files...")
-        remaining_files = list(Path(STAGING_PATH).glob("*/*/*"))
+        remaining_files = [entry.path for entry in scan_staged()]
         if remaining_files:
             logger.info(f"Found {len(remaining_files)} un-uploaded files, performing final upload...")
             self.emergency_upload(remaining_files)
@@ -1903,6 +2880,16 @@ class AutoTuningOrchestrator:
         logger.info(f"Processing rate: {total_processed/max(1,elapsed):.1f} files/sec")
         logger.info("="*60)
         
+        self.tuning_log.close()
+        
+        # Release the shared memory pool
+        for shm in self.shm_segments:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+        
         # Close database pool
         if connection_pool:
             connection_pool.closeall()
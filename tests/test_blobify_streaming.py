@@ -15,8 +15,17 @@ import pytest
 # Import from parent directory
 import sys
 sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+from blob_format import BLOB_MAGIC, read_header
 from blobify import create_blob
-from deblobify import restore_blob
+from deblobify import restore_blob, restore_many
+
+
+def read_blob_metadata(blob_path: Path) -> dict:
+    """Read the metadata header of a binary container blob."""
+    with open(blob_path, "rb") as bf:
+        metadata = read_header(bf)
+    assert metadata is not None
+    return metadata
 
 
 class TestBlobifyStreaming:
@@ -37,20 +46,11 @@ class TestBlobifyStreaming:
             blob_path = Path(f"/tmp/{blobid}")
             assert blob_path.exists()
             
-            # Load and verify blob structure
-            with open(blob_path) as bf:
-                blob_data = json.load(bf)
-                
-            assert "content" in blob_data
-            assert "metadata" in blob_data
-            assert blob_data["metadata"]["size"] == len(content)
-            assert blob_data["metadata"]["encryption"] is False
-            
-            # Verify new multi-frame format
-            if isinstance(blob_data["content"], dict):
-                assert blob_data["content"]["encoding"] == "lz4-multiframe"
-                assert "frames" in blob_data["content"]
-                assert len(blob_data["content"]["frames"]) > 0
+            # Verify binary container structure
+            assert blob_path.read_bytes()[:4] == BLOB_MAGIC
+            metadata = read_blob_metadata(blob_path)
+            assert metadata["size"] == len(content)
+            assert metadata["encryption"] is False
             
             # Clean up
             blob_path.unlink()
@@ -72,15 +72,8 @@ class TestBlobifyStreaming:
             blob_path = Path(f"/tmp/{blobid}")
             assert blob_path.exists()
             
-            # Verify metadata and format
-            with open(blob_path) as bf:
-                blob_data = json.load(bf)
-                
-            assert blob_data["metadata"]["size"] == len(content)
-            
-            # Should be multi-frame format for large files
-            if isinstance(blob_data["content"], dict):
-                assert blob_data["content"]["encoding"] == "lz4-multiframe"
+            # Verify metadata
+            assert read_blob_metadata(blob_path)["size"] == len(content)
             
             # Clean up
             blob_path.unlink()
@@ -125,18 +118,11 @@ class TestBlobifyStreaming:
             
             # Load blob and check filetype was detected
             blob_path = Path(f"/tmp/{blobid}")
-            with open(blob_path) as bf:
-                blob_data = json.load(bf)
-                
             # Should detect as text (exact string depends on system magic)
-            filetype = blob_data["metadata"]["filetype"]
+            filetype = read_blob_metadata(blob_path)["filetype"]
             assert filetype != "unknown"
             assert "text" in filetype.lower() or "ascii" in filetype.lower()
             
-            # Should be multi-frame format
-            if isinstance(blob_data["content"], dict):
-                assert blob_data["content"]["encoding"] == "lz4-multiframe"
-            
             # Clean up
             blob_path.unlink()
             Path(f.name).unlink()
@@ -169,9 +155,9 @@ class TestBlobifyStreaming:
             Path(f.name).unlink()
             Path(restored_path).unlink()
 
-    def test_multi_frame_streaming(self):
-        """Test that multi-frame format uses constant memory."""
-        # Create content larger than single frame (>10MB)
+    def test_multi_chunk_streaming(self):
+        """Test that content spanning several read chunks round-trips."""
+        # Create content larger than one read chunk (>10MB)
         content = b"X" * (15 * 1024 * 1024)  # 15MB
         
         with tempfile.NamedTemporaryFile(delete=False) as f:
@@ -179,18 +165,7 @@ class TestBlobifyStreaming:
             f.flush()
             
             blobid = create_blob(Path(f.name), "/tmp")
-            
-            # Verify multi-frame format was used
             blob_path = Path(f"/tmp/{blobid}")
-            with open(blob_path) as bf:
-                blob_data = json.load(bf)
-                
-            assert isinstance(blob_data["content"], dict)
-            assert blob_data["content"]["encoding"] == "lz4-multiframe"
-            
-            # Should have multiple frames for 15MB content
-            frames = blob_data["content"]["frames"]
-            assert len(frames) >= 2  # At least 2 frames for 15MB with 10MB chunks
             
             # Test streaming decompression
             with tempfile.NamedTemporaryFile(delete=False) as restored_f:
@@ -221,11 +196,115 @@ class TestBlobifyStreaming:
             blob_path = Path(f"/tmp/{blobid}")
             assert blob_path.exists()
             
-            with open(blob_path) as bf:
-                blob_data = json.load(bf)
-                
-            assert blob_data["metadata"]["size"] == 0
+            assert read_blob_metadata(blob_path)["size"] == 0
             
             # Clean up
             blob_path.unlink()
-            Path(f.name).unlink()
\ No newline at end of file
+            Path(f.name).unlink()
+
+    def test_legacy_single_string_format(self):
+        """Test that original single-base64-string blobs still restore."""
+        import base64
+
+        import blake3
+        import lz4.frame
+
+        content = b"legacy blob content\n" * 500
+        blobid = blake3.blake3(content).hexdigest()
+        blob_data = {
+            "content": base64.b64encode(
+                lz4.frame.compress(content)
+            ).decode("ascii"),
+            "metadata": {"size": len(content), "mtime": 1700000000.0},
+        }
+
+        blob_path = Path(f"/tmp/{blobid}")
+        blob_path.write_text(json.dumps(blob_data))
+
+        with tempfile.NamedTemporaryFile(delete=False) as restored_f:
+            restored_path = restored_f.name
+
+        restore_blob(str(blob_path), restored_path, verify=True)
+
+        assert Path(restored_path).read_bytes() == content
+        assert Path(restored_path).stat().st_mtime == 1700000000.0
+
+        # Clean up
+        blob_path.unlink()
+        Path(restored_path).unlink()
+
+    def test_legacy_multiframe_format(self):
+        """Test that JSON multi-frame blobs written before the binary
+        container still restore."""
+        import base64
+
+        import blake3
+        import lz4.frame
+
+        content = b"multiframe legacy\n" * 100_000
+        blobid = blake3.blake3(content).hexdigest()
+        frames = [
+            base64.b64encode(lz4.frame.compress(content[i:i + 1_000_000]))
+            .decode("ascii")
+            for i in range(0, len(content), 1_000_000)
+        ]
+        assert len(frames) >= 2
+
+        blob_path = Path(f"/tmp/{blobid}")
+        with open(blob_path, "w") as bf:
+            bf.write('{\n  "content": {\n    "encoding": "lz4-multiframe",'
+                     '\n    "frames": [\n')
+            bf.write(",\n".join(f'      "{frame}"' for frame in frames))
+            bf.write('\n    ]\n  },\n  "metadata": {\n')
+            bf.write(f'    "size": {len(content)},\n')
+            bf.write('    "mtime": 1700000000.0,\n')
+            bf.write('    "filetype": "text",\n')
+            bf.write('    "encryption": false\n  }\n}')
+
+        with tempfile.NamedTemporaryFile(delete=False) as restored_f:
+            restored_path = restored_f.name
+
+        restore_blob(str(blob_path), restored_path, verify=True)
+
+        assert Path(restored_path).read_bytes() == content
+
+        # Clean up
+        blob_path.unlink()
+        Path(restored_path).unlink()
+
+    def test_truncated_binary_blob(self):
+        """Test that a binary blob cut short fails instead of restoring short."""
+        content = b"truncate me\n" * 50_000
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / "source"
+            source.write_bytes(content)
+            blobid = create_blob(source, tmp_dir)
+            blob_path = Path(tmp_dir) / blobid
+            blob_path.write_bytes(blob_path.read_bytes()[:-16])
+
+            with pytest.raises(ValueError, match="Truncated"):
+                restore_blob(str(blob_path), f"{tmp_dir}/restored", verify=False)
+
+    def test_restore_many(self):
+        """Test batch restore writes every blob and reports mismatches."""
+        contents = [b"first\n" * 1000, b"second\n" * 2000, b""]
+        pairs = []
+        # Sources, blobs and outputs all live in the temp dir, which is
+        # removed even when an assertion fails
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i, content in enumerate(contents):
+                source = Path(tmp_dir) / f"source_{i}"
+                source.write_bytes(content)
+                blobid = create_blob(source, tmp_dir)
+                pairs.append((f"{tmp_dir}/{blobid}", f"{tmp_dir}/restored_{i}"))
+
+            # A blob whose name does not match its content
+            bad_path = Path(tmp_dir) / ("0" * 64)
+            bad_path.write_bytes(Path(pairs[0][0]).read_bytes())
+            failures = restore_many(
+                pairs + [(str(bad_path), f"{tmp_dir}/restored_bad")], jobs=2)
+
+            assert failures == [(str(bad_path), "hash mismatch")]
+            for (_, output_path), content in zip(pairs, contents):
+                assert Path(output_path).read_bytes() == content